@@ -1,34 +1,531 @@
 from typing import List, Dict
-from statistics import mean, stdev
+from array import array
 from collections import deque
+import json
 import math
+import pickle
+import sys
+import time
+import tracemalloc
 from src.backtester import Order, OrderBook
+from src.bookview import BookView
+
+def _float_sqrt_of_frac(n, m):
+    """Square root of n/m as a correctly rounded float, as ``statistics.stdev`` takes it."""
+    q = (n.bit_length() - m.bit_length() - 2 * sys.float_info.mant_dig - 3) // 2
+    if q >= 0:
+        m <<= 2 * q
+    else:
+        n <<= -2 * q
+    # Round to odd, so that converting to float rounds only once.
+    root = math.isqrt(n // m)
+    root |= root * root * m != n
+    return float(root << q) if q >= 0 else root / (1 << -q)
+
+class RollingWindow:
+    """Fixed-length window of floats with O(1) mean/stdev.
+
+    Keeps running sums of the values and their squares, plus the same sums
+    over any shorter trailing windows requested in ``tails``, so every
+    statistic is available without rescanning the history. The sums are
+    exact integers: every value is scaled by one power of two (2 for
+    half-tick mids), raised whenever a value needs more fractional bits.
+    ``mean`` and ``stdev`` therefore equal ``statistics.mean`` and
+    ``statistics.stdev`` over the same values, however long the replay.
+    """
+    def __init__(self, maxlen, tails=()):
+        self.maxlen = maxlen
+        self.values = deque(maxlen=maxlen)
+        # The values times 2**shift, as ints.
+        self._scaled = deque(maxlen=maxlen)
+        self._shift = 0
+        self._sum = 0
+        self._sum_sq = 0
+        self._tails = {k: [0, 0] for k in tails}
+        self._std = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def _raise_shift(self, bits):
+        grow = bits - self._shift
+        self._shift = bits
+        self._scaled = deque((v << grow for v in self._scaled), maxlen=self.maxlen)
+        self._sum <<= grow
+        self._sum_sq <<= 2 * grow
+        for sums in self._tails.values():
+            sums[0] <<= grow
+            sums[1] <<= 2 * grow
+
+    def append(self, value):
+        numerator, denominator = value.as_integer_ratio()
+        bits = denominator.bit_length() - 1
+        if bits > self._shift:
+            self._raise_shift(bits)
+        new = numerator << (self._shift - bits)
+        scaled = self._scaled
+        for k, sums in self._tails.items():
+            if len(scaled) >= k:
+                old = scaled[-k]
+                sums[0] += new - old
+                sums[1] += new * new - old * old
+            else:
+                sums[0] += new
+                sums[1] += new * new
+
+        if len(scaled) == self.maxlen:
+            old = scaled[0]
+            self._sum += new - old
+            self._sum_sq += new * new - old * old
+        else:
+            self._sum += new
+            self._sum_sq += new * new
+        scaled.append(new)
+        self.values.append(value)
+        self._std = None
+
+    def _rebuild(self):
+        self._shift = 0
+        self._scaled = deque(maxlen=self.maxlen)
+        self._sum = self._sum_sq = 0
+        self._tails = {k: [0, 0] for k in self._tails}
+        self._std = None
+        values = self.values
+        self.values = deque(maxlen=self.maxlen)
+        for value in values:
+            self.append(value)
+
+    def _mean(self, n, total):
+        return total / (n << self._shift)
+
+    def _stdev(self, n, total, total_sq):
+        if n < 2:
+            return 0.0
+        spread = n * total_sq - total * total
+        if spread <= 0:
+            return 0.0
+        return _float_sqrt_of_frac(spread, (n * (n - 1)) << (2 * self._shift))
+
+    def mean(self):
+        return self._mean(len(self.values), self._sum)
+
+    def stdev(self):
+        if self._std is None:
+            self._std = self._stdev(len(self.values), self._sum, self._sum_sq)
+        return self._std
+
+    def zscore(self, value):
+        std = self.stdev()
+        return (value - self.mean()) / std if std > 0 else 0
+
+    def tail_mean(self, k):
+        return self._mean(min(k, len(self.values)), self._tails[k][0])
+
+    def tail_stdev(self, k):
+        total, total_sq = self._tails[k]
+        return self._stdev(min(k, len(self.values)), total, total_sq)
+
+    def get_state(self):
+        # The sums follow exactly from the values, so they are rebuilt on load.
+        return {'values': array('d', self.values)}
+
+    def set_state(self, state):
+        self.values = deque(state['values'], maxlen=self.maxlen)
+        self._rebuild()
+
+class RollingRegression:
+    """Rolling least-squares fit of ``y_name``'s mid on ``x_name``'s mid.
+
+    Running sums of x, y, x*x, x*y and y*y over the last ``maxlen`` ticks
+    give the slope, and the spread of the residuals under any slope, in
+    O(1) per tick. As in ``RollingWindow`` the sums are exact integers over
+    the points scaled by one power of two, so both only depend on the points
+    in the window, not on how long the fit has run.
+    ``observe`` takes at most one point per ``MarketSnapshot``, so strategies
+    on either leg can share one instance.
+    """
+    def __init__(self, y_name, x_name, maxlen):
+        self.y_name = y_name
+        self.x_name = x_name
+        self.maxlen = maxlen
+        self.points = deque(maxlen=maxlen)
+        # The points times 2**shift, as ints.
+        self._scaled = deque(maxlen=maxlen)
+        self._shift = 0
+        self._sums = [0, 0, 0, 0, 0]
+        self._last_market = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def observe(self, market):
+        if market is self._last_market:
+            return
+        self._last_market = market
+        x = market.mid.get(self.x_name)
+        y = market.mid.get(self.y_name)
+        if x is None or y is None:
+            return
+        self._add(x, y)
+
+    def _raise_shift(self, bits):
+        grow = bits - self._shift
+        self._shift = bits
+        self._scaled = deque(((x << grow, y << grow) for x, y in self._scaled), maxlen=self.maxlen)
+        sums = self._sums
+        sums[0] <<= grow
+        sums[1] <<= grow
+        sums[2] <<= 2 * grow
+        sums[3] <<= 2 * grow
+        sums[4] <<= 2 * grow
+
+    def _add(self, x, y):
+        x_num, x_den = x.as_integer_ratio()
+        y_num, y_den = y.as_integer_ratio()
+        bits = max(x_den, y_den).bit_length() - 1
+        if bits > self._shift:
+            self._raise_shift(bits)
+        shift = self._shift + 1
+        new_x = x_num << (shift - x_den.bit_length())
+        new_y = y_num << (shift - y_den.bit_length())
+
+        sums = self._sums
+        if len(self._scaled) == self.maxlen:
+            old_x, old_y = self._scaled[0]
+            sums[0] -= old_x
+            sums[1] -= old_y
+            sums[2] -= old_x * old_x
+            sums[3] -= old_x * old_y
+            sums[4] -= old_y * old_y
+        sums[0] += new_x
+        sums[1] += new_y
+        sums[2] += new_x * new_x
+        sums[3] += new_x * new_y
+        sums[4] += new_y * new_y
+        self._scaled.append((new_x, new_y))
+        self.points.append((x, y))
+
+    def get_state(self):
+        # The sums follow exactly from the points, so they are rebuilt on load.
+        xs = array('d', (p[0] for p in self.points))
+        ys = array('d', (p[1] for p in self.points))
+        return {'x': xs, 'y': ys}
+
+    def set_state(self, state):
+        self.points = deque(maxlen=self.maxlen)
+        self._scaled = deque(maxlen=self.maxlen)
+        self._shift = 0
+        self._sums = [0, 0, 0, 0, 0]
+        self._last_market = None
+        for x, y in zip(state['x'], state['y']):
+            self._add(x, y)
+
+    def beta(self):
+        """Slope of y on x, or None while the fit is degenerate."""
+        n = len(self.points)
+        if n < 2:
+            return None
+        sum_x, sum_y, sum_xx, sum_xy, _ = self._sums
+        var_x = n * sum_xx - sum_x * sum_x
+        if var_x <= 0:
+            return None
+        # Both terms carry the same 2**(2 * shift), and int / int rounds once.
+        return (n * sum_xy - sum_x * sum_y) / var_x
+
+    def residual_zscore(self, product, ratio, mid, other_mid):
+        """Z-score of ``mid - ratio * other_mid`` among the same spread over the window.
+
+        ``product`` is either leg; ``other_mid`` is the other leg's mid. Every
+        spread in the window is taken under the same ``ratio``, so a ratio
+        that moves from tick to tick does not leak into the score. Returns 0
+        while the spreads do not vary.
+        """
+        n = len(self.points)
+        if n < 2:
+            return 0.0
+        sum_x, sum_y, sum_xx, sum_xy, sum_yy = self._sums
+        if product != self.y_name:
+            sum_x, sum_y, sum_xx, sum_yy = sum_y, sum_x, sum_yy, sum_xx
+        # n * (n - 1) * 4**shift times the spreads' variance; the three
+        # centred sums are exact, so only their combination rounds.
+        spread = ((n * sum_yy - sum_y * sum_y) - 2 * ratio * (n * sum_xy - sum_x * sum_y)
+                  + ratio * ratio * (n * sum_xx - sum_x * sum_x))
+        if spread <= 0:
+            return 0.0
+        scale = 1 << self._shift
+        mean = (sum_y - ratio * sum_x) / (n * scale)
+        return (mid - ratio * other_mid - mean) / (math.sqrt(spread / (n * (n - 1))) / scale)
+
+    def ratio(self, product):
+        """Units of the other leg that hedge one unit of ``product``, or None."""
+        beta = self.beta()
+        if beta is None or beta <= 0:
+            return None
+        return beta if product == self.y_name else 1.0 / beta
+
+class MarketSnapshot:
+    """Top of book for every product at one timestamp.
+
+    Built once per ``Trader.run`` call and handed to every strategy, so
+    cross-product strategies look component prices up instead of rescanning
+    the books.
+    """
+    def __init__(self, order_depth):
+        self.books = {product: BookView(orderbook, product) for product, orderbook in order_depth.items()}
+        self.mid = {}
+        self.spread = {}
+        self.bid_volume = {}
+        self.ask_volume = {}
+        for product, book in self.books.items():
+            if book.mid is not None:
+                self.mid[product] = book.mid
+                self.spread[product] = book.spread
+            self.bid_volume[product] = book.bid_volume
+            self.ask_volume[product] = book.ask_volume
+
+class FeatureCache:
+    """Mid-price features per product, updated once per tick and shared by strategies.
+
+    ``track`` registers what a strategy reads: rolling windows of any length
+    (one ``RollingWindow`` per product, as long as the longest request, with
+    the shorter lengths kept as tails), EWMAs by span and OHLC bars of a
+    number of ticks. ``update`` takes at most one mid per product per
+    ``MarketSnapshot``; products without both sides quoted are skipped.
+    """
+    def __init__(self, max_bars=100):
+        self.max_bars = max_bars
+        self.windows = {}
+        self.history = {}
+        self.ewmas = {}
+        self.bar_sizes = {}
+        self.bars = {}
+        self.open_bars = {}
+        self._last_market = None
+
+    def track(self, product, windows=(), ewma_spans=(), bar_sizes=()):
+        windows = set(windows) - self.windows.get(product, set())
+        if windows:
+            self.windows[product] = self.windows.get(product, set()) | windows
+            lengths = sorted(self.windows[product])
+            old = self.history.get(product, ())
+            self.history[product] = RollingWindow(lengths[-1], tails=lengths[:-1])
+            for value in old:
+                self.history[product].append(value)
+        for span in ewma_spans:
+            self.ewmas.setdefault(product, {}).setdefault(span, None)
+        for size in bar_sizes:
+            self.bar_sizes.setdefault(product, set()).add(size)
+            self.bars.setdefault((product, size), deque(maxlen=self.max_bars))
+        return self
+
+    def update(self, market):
+        if market is self._last_market:
+            return
+        self._last_market = market
+        for product, mid in market.mid.items():
+            history = self.history.get(product)
+            if history is not None:
+                history.append(mid)
+            ewmas = self.ewmas.get(product)
+            if ewmas:
+                for span, value in ewmas.items():
+                    alpha = 2 / (span + 1)
+                    ewmas[span] = mid if value is None else value + alpha * (mid - value)
+            for size in self.bar_sizes.get(product, ()):
+                self._add_to_bar(product, size, mid)
+
+    def _add_to_bar(self, product, size, mid):
+        bar = self.open_bars.get((product, size))
+        if bar is None:
+            self.open_bars[(product, size)] = [mid, mid, mid, mid, 1]
+            bar = self.open_bars[(product, size)]
+        else:
+            bar[1] = max(bar[1], mid)
+            bar[2] = min(bar[2], mid)
+            bar[3] = mid
+            bar[4] += 1
+        if bar[4] == size:
+            self.bars[(product, size)].append(tuple(bar[:4]))
+            del self.open_bars[(product, size)]
+
+    def count(self, product, window):
+        """Ticks available in ``product``'s ``window`` (at most ``window``)."""
+        return min(window, len(self.history[product]))
+
+    def mean(self, product, window):
+        history = self.history[product]
+        return history.mean() if window == history.maxlen else history.tail_mean(window)
+
+    def stdev(self, product, window):
+        history = self.history[product]
+        return history.stdev() if window == history.maxlen else history.tail_stdev(window)
+
+    def zscore(self, product, window, value):
+        std = self.stdev(product, window)
+        return (value - self.mean(product, window)) / std if std > 0 else 0
+
+    def ewma(self, product, span):
+        return self.ewmas[product][span]
+
+    def ohlc(self, product, size):
+        """Completed ``(open, high, low, close)`` bars of ``size`` ticks, oldest first."""
+        return self.bars[(product, size)]
+
+    def get_state(self, products=None):
+        """Features of every product, or only of ``products``."""
+        def kept(product):
+            return products is None or product in products
+        return {
+            'history': {product: window.get_state() for product, window in self.history.items() if kept(product)},
+            'ewmas': {product: dict(spans) for product, spans in self.ewmas.items() if kept(product)},
+            'bars': {key: [array('d', bar) for bar in bars] for key, bars in self.bars.items() if kept(key[0])},
+            'open_bars': {key: list(bar) for key, bar in self.open_bars.items() if kept(key[0])},
+        }
+
+    def set_state(self, state):
+        """Restore ``get_state`` output; products missing from it keep their features."""
+        for product, saved in state['history'].items():
+            if product in self.history:
+                self.history[product].set_state(saved)
+        for product, spans in state['ewmas'].items():
+            for span, value in spans.items():
+                if span in self.ewmas.get(product, {}):
+                    self.ewmas[product][span] = value
+        for key, bars in state['bars'].items():
+            if key in self.bars:
+                self.bars[key] = deque((tuple(bar) for bar in bars), maxlen=self.max_bars)
+        restored = {key for key in state['bars'] if key in self.bars}
+        self.open_bars = {key: bar for key, bar in self.open_bars.items() if key not in restored}
+        self.open_bars.update((key, list(bar)) for key, bar in state['open_bars'].items() if key in restored)
+        self._last_market = None
+
+class OrderBuffer:
+    """Reusable list of orders backed by flat arrays.
+
+    Each strategy owns one and refills it every tick with ``add`` instead of
+    allocating ``Order`` objects and a fresh list. Prices are stored as
+    floats, so books with fractional prices can be traded; ``to_orders``
+    gives whole prices back as ints. Every order also carries the id of the
+    strategy that emitted it (an index into ``Trader.strategy_names``):
+    ``owner`` unless ``add`` is told otherwise. The contents are only valid
+    until the strategy's next ``get_orders``.
+    """
+    __slots__ = ('symbols', 'prices', 'quantities', 'strategies', 'owner')
+
+    def __init__(self, owner=0):
+        self.symbols = []
+        self.prices = array('d')
+        self.quantities = array('q')
+        self.strategies = array('H')
+        self.owner = owner
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __iter__(self):
+        return zip(self.symbols, self.prices, self.quantities)
+
+    def add(self, symbol, price, quantity, strategy=None):
+        self.symbols.append(symbol)
+        self.prices.append(price)
+        self.quantities.append(quantity)
+        self.strategies.append(self.owner if strategy is None else strategy)
+
+    def clear(self):
+        del self.symbols[:]
+        del self.prices[:]
+        del self.quantities[:]
+        del self.strategies[:]
+
+    def tagged(self):
+        """``(symbol, price, quantity, strategy)`` of every order."""
+        return zip(self.symbols, self.prices, self.quantities, self.strategies)
+
+    def to_orders(self):
+        return [Order(symbol, int(price) if price.is_integer() else price, quantity)
+                for symbol, price, quantity in self]
+
+def _dump_state(value):
+    if hasattr(value, 'get_state'):
+        return value.get_state()
+    if isinstance(value, deque):
+        return array('d', value)
+    return value
+
+def _load_state(current, saved):
+    if hasattr(current, 'set_state'):
+        current.set_state(saved)
+        return current
+    if isinstance(current, deque):
+        return deque(saved, maxlen=current.maxlen)
+    return saved
 
 class BaseClass:
+    # Attributes that carry history from tick to tick; see get_state.
+    state_attrs = ()
+    # True when get_orders depends only on the top of book of depends_on()
+    # and the position, so Trader.run may reuse the last orders while those
+    # are unchanged. Strategies that record history every tick cannot.
+    stateless = False
+
     def __init__(self, product_name, max_position):
         self.product_name = product_name
         self.max_position = max_position
+        self.orders = OrderBuffer()
+
+    def position_limit(self, product):
+        return self.max_position
+
+    def depends_on(self):
+        """Products whose books or positions this strategy reads."""
+        return {self.product_name}
 
-    def get_orders(self, state, orderbook, position):
-        return []
+    def buffers(self):
+        """Every OrderBuffer this strategy returns orders in."""
+        return [self.orders]
+
+    def get_state(self):
+        """Everything in ``state_attrs``, as plain values and ``array('d')``s."""
+        return {name: _dump_state(getattr(self, name)) for name in self.state_attrs}
+
+    def set_state(self, state):
+        for name, saved in state.items():
+            setattr(self, name, _load_state(getattr(self, name), saved))
+
+    def new_orders(self):
+        """This strategy's order buffer, emptied for a new tick."""
+        self.orders.clear()
+        return self.orders
+
+    def get_orders(self, state, orderbook, position, market):
+        return self.new_orders()
 
 class SudowoodoStrategy(BaseClass):
-    def __init__(self):
+    stateless = True
+
+    def __init__(self, fair_value=10000, tick_size=1, min_spread=2, max_order_size=15):
         super().__init__('SUDOWOODO', 50)
-        self.fair_value = 10000
-        self.tick_size = 1
-        self.min_spread = 2
+        self.fair_value = fair_value
+        self.tick_size = tick_size
+        self.min_spread = min_spread
+        self.max_order_size = max_order_size
 
-    def get_orders(self, state, orderbook, position):
-        orders = []
-        best_bid = max(orderbook.buy_orders.keys()) if orderbook.buy_orders else None
-        best_ask = min(orderbook.sell_orders.keys()) if orderbook.sell_orders else None
+    def get_orders(self, state, orderbook, position, market):
+        orders = self.new_orders()
+        best_bid = orderbook.best_bid
+        best_ask = orderbook.best_ask
 
         if best_bid is None or best_ask is None:
             return orders
 
-        mid = (best_bid + best_ask) / 2
-        spread = best_ask - best_bid
+        mid = orderbook.mid
+        spread = orderbook.spread
         
         # Aggressive market making with tight spreads
         if spread > self.min_spread:
@@ -41,308 +538,839 @@ class SudowoodoStrategy(BaseClass):
             sell_price = mid + 1
 
         # Dynamic position sizing based on current position
-        max_order_size = 15
         position_factor = 1 - abs(position) / self.max_position
-        order_size = int(max_order_size * position_factor)
+        order_size = int(self.max_order_size * position_factor)
         
         if position < self.max_position and order_size > 0:
-            orders.append(Order(self.product_name, int(buy_price), min(order_size, self.max_position - position)))
+            orders.add(self.product_name, int(buy_price), min(order_size, self.max_position - position))
         if position > -self.max_position and order_size > 0:
-            orders.append(Order(self.product_name, int(sell_price), -min(order_size, position + self.max_position)))
+            orders.add(self.product_name, int(sell_price), -min(order_size, position + self.max_position))
 
         return orders
 
 class DrowzeeStrategy(BaseClass):
-    def __init__(self):
+    state_attrs = ('volume_history',)
+
+    def __init__(self, window=50, short_window=10, volume_window=20, entry_std=0.8, base_size=12, features=None):
         super().__init__('DROWZEE', 50)
-        self.history = deque(maxlen=50)  # Shorter window for faster signals
-        self.volume_history = deque(maxlen=20)
+        self.window = window
+        self.short_window = short_window  # Shorter window for faster signals
+        self.entry_std = entry_std
+        self.base_size = base_size
+        self.features = features if features is not None else FeatureCache()
+        self.features.track('DROWZEE', windows=(window, short_window))
+        self.volume_history = deque(maxlen=volume_window)
 
-    def get_orders(self, state, orderbook, position):
-        orders = []
-        best_bid = max(orderbook.buy_orders.keys()) if orderbook.buy_orders else None
-        best_ask = min(orderbook.sell_orders.keys()) if orderbook.sell_orders else None
+    def get_orders(self, state, orderbook, position, market):
+        orders = self.new_orders()
+        best_bid = orderbook.best_bid
+        best_ask = orderbook.best_ask
 
         if best_bid is None or best_ask is None:
             return orders
 
-        mid = (best_bid + best_ask) / 2
-        self.history.append(mid)
+        mid = orderbook.mid
+        features = self.features
+        features.update(market)
         
         # Track volume at best levels
-        bid_volume = orderbook.buy_orders.get(best_bid, 0)
-        ask_volume = orderbook.sell_orders.get(best_ask, 0)
+        bid_volume = orderbook.bid_volume
+        ask_volume = orderbook.ask_volume
         volume_imbalance = bid_volume - ask_volume
         
-        if len(self.history) < 10:
+        if features.count('DROWZEE', self.window) < self.short_window:
             return orders
 
         # Use shorter-term and longer-term averages
-        short_avg = mean(list(self.history)[-10:])
-        long_avg = mean(self.history)
-        std_dev = stdev(self.history)
+        short_avg = features.mean('DROWZEE', self.short_window)
+        long_avg = features.mean('DROWZEE', self.window)
+        std_dev = features.stdev('DROWZEE', self.window)
         
         # Mean reversion with momentum confirmation
         momentum = mid - long_avg
         volatility_factor = std_dev / mid if mid > 0 else 0
         
         # Adjust thresholds based on volatility
-        buy_threshold = -0.8 * std_dev
-        sell_threshold = 0.8 * std_dev
+        buy_threshold = -self.entry_std * std_dev
+        sell_threshold = self.entry_std * std_dev
         
         # Order sizing based on confidence
-        base_size = 12
         confidence_multiplier = min(2.0, abs(momentum) / std_dev) if std_dev > 0 else 1.0
-        order_size = int(base_size * confidence_multiplier)
+        order_size = int(self.base_size * confidence_multiplier)
         
         if momentum < buy_threshold and position < self.max_position:
             # Buy signal - price below short average
             price = best_bid + 1 if volume_imbalance > 0 else best_bid
-            orders.append(Order(self.product_name, price, min(order_size, self.max_position - position)))
+            orders.add(self.product_name, price, min(order_size, self.max_position - position))
         elif momentum > sell_threshold and position > -self.max_position:
             # Sell signal - price above short average  
             price = best_ask - 1 if volume_imbalance < 0 else best_ask
-            orders.append(Order(self.product_name, price, -min(order_size, position + self.max_position)))
+            orders.add(self.product_name, price, -min(order_size, position + self.max_position))
 
         return orders
 
 class AbraStrategy(BaseClass):
-    def __init__(self):
+    state_attrs = ('trend_history',)
+
+    def __init__(self, window=80, min_history=20, trend_window=10, base_threshold=1.2, trend_weight=0.3,
+                 max_order=15, features=None):
         super().__init__('ABRA', 50)
-        self.history = deque(maxlen=80)
+        self.window = window
+        self.min_history = max(min_history, trend_window)
+        self.trend_window = trend_window
+        self.base_threshold = base_threshold
+        self.trend_weight = trend_weight
+        self.max_order = max_order
+        self.features = features if features is not None else FeatureCache()
+        self.features.track('ABRA', windows=(window,))
         self.trend_history = deque(maxlen=20)
 
-    def get_orders(self, state, orderbook, position):
-        orders = []
-        best_bid = max(orderbook.buy_orders.keys()) if orderbook.buy_orders else None
-        best_ask = min(orderbook.sell_orders.keys()) if orderbook.sell_orders else None
+    def get_orders(self, state, orderbook, position, market):
+        orders = self.new_orders()
+        best_bid = orderbook.best_bid
+        best_ask = orderbook.best_ask
 
         if best_bid is None or best_ask is None:
             return orders
 
-        mid = (best_bid + best_ask) / 2
-        self.history.append(mid)
+        mid = orderbook.mid
+        features = self.features
+        features.update(market)
         
-        if len(self.history) < 20:
+        if features.count('ABRA', self.window) < self.min_history:
             return orders
 
-        avg = mean(self.history)
-        std_dev = stdev(self.history)
-        z_score = (mid - avg) / std_dev if std_dev > 0 else 0
+        std_dev = features.stdev('ABRA', self.window)
+        z_score = features.zscore('ABRA', self.window, mid)
         
-        # Calculate trend
-        recent_prices = list(self.history)[-10:]
-        trend = (recent_prices[-1] - recent_prices[0]) / len(recent_prices)
+        # Calculate trend over the last few ticks
+        history = features.history['ABRA']
+        trend = (history[-1] - history[-self.trend_window]) / self.trend_window
         self.trend_history.append(trend)
         
         # Combine mean reversion with trend following
         trend_strength = abs(trend) / std_dev if std_dev > 0 else 0
         
         # Dynamic thresholds
-        base_threshold = 1.2
-        trend_adjustment = 0.3 * trend_strength
+        trend_adjustment = self.trend_weight * trend_strength
         
-        buy_threshold = -(base_threshold + trend_adjustment)
-        sell_threshold = base_threshold + trend_adjustment
+        buy_threshold = -(self.base_threshold + trend_adjustment)
+        sell_threshold = self.base_threshold + trend_adjustment
         
         # Position sizing with risk management
-        max_order = 15
         risk_factor = 1 - abs(position) / self.max_position
-        order_size = int(max_order * risk_factor)
+        order_size = int(self.max_order * risk_factor)
         
         if z_score < buy_threshold and position < self.max_position:
             # Strong buy signal
             price = best_bid + 1 if trend > 0 else best_bid
-            orders.append(Order(self.product_name, price, min(order_size, self.max_position - position)))
+            orders.add(self.product_name, price, min(order_size, self.max_position - position))
         elif z_score > sell_threshold and position > -self.max_position:
             # Strong sell signal
             price = best_ask - 1 if trend < 0 else best_ask
-            orders.append(Order(self.product_name, price, -min(order_size, position + self.max_position)))
+            orders.add(self.product_name, price, -min(order_size, position + self.max_position))
 
         return orders
 
 class PairsTradingStrategy(BaseClass):
-    def __init__(self, name, max_position, pair_name):
+    state_attrs = ('hedge', 'hedge_ratio')
+
+    def __init__(self, name, max_position, pair_name, hedge_window=30, entry_threshold=1.5,
+                 exit_threshold=0.3, order_size=12, exit_size=8, hedge=None):
         super().__init__(name, max_position)
         self.pair_name = pair_name
-        self.spread_history = deque(maxlen=100)
+        self.hedge_window = hedge_window
+        self.entry_threshold = entry_threshold
+        self.exit_threshold = exit_threshold
+        self.order_size = order_size
+        self.exit_size = exit_size
+        self.hedge = hedge if hedge is not None else RollingRegression(name, pair_name, hedge_window)
         self.hedge_ratio = 1.0  # Will be dynamically calculated
 
+    def depends_on(self):
+        return {self.product_name, self.pair_name}
+
     def calculate_hedge_ratio(self):
-        """Calculate optimal hedge ratio using recent price movements"""
-        if len(self.spread_history) < 30:
+        """Rolling OLS slope of this leg's mid on the pair's mid"""
+        if len(self.hedge) < self.hedge_window:
             return 1.0
         
-        # Simple correlation-based hedge ratio
-        recent_spreads = list(self.spread_history)[-30:]
-        variance = stdev(recent_spreads) ** 2
-        return max(0.5, min(2.0, 1.0 / (1.0 + variance)))
-
-    def get_orders(self, state, orderbook, position):
-        if self.pair_name not in state.order_depth:
-            return []
-        
+        ratio = self.hedge.ratio(self.product_name)
+        return ratio if ratio is not None else self.hedge_ratio
+
+    def get_orders(self, state, orderbook, position, market):
+        orders = self.new_orders()
         this_ob = orderbook
-        pair_ob = state.order_depth[self.pair_name]
+        pair_mid = market.mid.get(self.pair_name)
         
-        if not (this_ob.buy_orders and this_ob.sell_orders and pair_ob.buy_orders and pair_ob.sell_orders):
-            return []
-        
-        this_mid = (max(this_ob.buy_orders.keys()) + min(this_ob.sell_orders.keys())) / 2
-        pair_mid = (max(pair_ob.buy_orders.keys()) + min(pair_ob.sell_orders.keys())) / 2
+        if this_ob.mid is None or pair_mid is None:
+            return orders
         
-        spread = this_mid - self.hedge_ratio * pair_mid
-        self.spread_history.append(spread)
+        this_mid = this_ob.mid
+        self.hedge.observe(market)
 
-        if len(self.spread_history) < 30:
-            return []
+        if len(self.hedge) < self.hedge_window:
+            return orders
 
-        # Update hedge ratio periodically
+        # The spread is scored over the points the ratio was fitted on, all
+        # under the current ratio, so it measures the residual of the fit.
         self.hedge_ratio = self.calculate_hedge_ratio()
-
-        avg_spread = mean(self.spread_history)
-        std_spread = stdev(self.spread_history)
-        z_score = (spread - avg_spread) / std_spread if std_spread > 0 else 0
-
-        orders = []
-        
-        # More aggressive thresholds for pairs trading
-        entry_threshold = 1.5
-        exit_threshold = 0.3
+        z_score = self.hedge.residual_zscore(self.product_name, self.hedge_ratio, this_mid, pair_mid)
         
         # Entry signals
-        if z_score > entry_threshold and position > -self.max_position:
+        if z_score > self.entry_threshold and position > -self.max_position:
             # Spread too high - sell this, buy pair
-            orders.append(Order(self.product_name, min(this_ob.sell_orders.keys()), -12))
-        elif z_score < -entry_threshold and position < self.max_position:
+            orders.add(self.product_name, this_ob.best_ask, -self.order_size)
+        elif z_score < -self.entry_threshold and position < self.max_position:
             # Spread too low - buy this, sell pair
-            orders.append(Order(self.product_name, max(this_ob.buy_orders.keys()), 12))
+            orders.add(self.product_name, this_ob.best_bid, self.order_size)
         
         # Exit signals when spread normalizes
-        elif abs(z_score) < exit_threshold and abs(position) > 5:
+        elif abs(z_score) < self.exit_threshold and abs(position) > 5:
             # Close position
             if position > 0:
-                orders.append(Order(self.product_name, min(this_ob.sell_orders.keys()), -min(8, position)))
+                orders.add(self.product_name, this_ob.best_ask, -min(self.exit_size, position))
             elif position < 0:
-                orders.append(Order(self.product_name, max(this_ob.buy_orders.keys()), min(8, -position)))
+                orders.add(self.product_name, this_ob.best_bid, min(self.exit_size, -position))
         
         return orders
 
+class PairStrategy(BaseClass):
+    """Trades the spread between two products as one hedged position.
+
+    Registered for both legs: the first ``get_orders`` call of a tick
+    computes the spread, hedge ratio and z-score once and fills an order
+    buffer per leg; the call for the other leg returns its buffer. Leg sizes
+    keep the hedge ratio and fit within both products' limits. The spread is
+    scored like ``PairsTradingStrategy``'s, as the residual of the current
+    fit over the hedge window.
+    """
+    state_attrs = ('hedge', 'hedge_ratio')
+
+    def __init__(self, leg_a, max_a, leg_b, max_b, hedge_window=30, entry_threshold=1.5,
+                 exit_threshold=0.3, order_size=12, exit_size=8):
+        super().__init__(f"{leg_a}/{leg_b}", max(max_a, max_b))
+        self.legs = (leg_a, leg_b)
+        self.max_positions = {leg_a: max_a, leg_b: max_b}
+        self.hedge_window = hedge_window
+        self.entry_threshold = entry_threshold
+        self.exit_threshold = exit_threshold
+        self.order_size = order_size
+        self.exit_size = exit_size
+        self.hedge = RollingRegression(leg_a, leg_b, hedge_window)
+        self.hedge_ratio = 1.0
+        self.leg_orders = {leg_a: OrderBuffer(), leg_b: OrderBuffer()}
+        self._last_market = None
+
+    def position_limit(self, product):
+        return self.max_positions.get(product, self.max_position)
+
+    def depends_on(self):
+        return set(self.legs)
+
+    def buffers(self):
+        return [self.orders, *self.leg_orders.values()]
+
+    def get_orders(self, state, orderbook, position, market):
+        if market is not self._last_market:
+            self._last_market = market
+            for orders in self.leg_orders.values():
+                orders.clear()
+            self._decide(getattr(state, 'positions', {}), market)
+        return self.leg_orders.get(orderbook.product, self.orders)
+
+    def _decide(self, positions, market):
+        leg_a, leg_b = self.legs
+        mid_a, mid_b = market.mid.get(leg_a), market.mid.get(leg_b)
+        if mid_a is None or mid_b is None:
+            return
+
+        self.hedge.observe(market)
+        if len(self.hedge) < self.hedge_window:
+            return
+
+        ratio = self.hedge.ratio(leg_a)
+        if ratio is not None:
+            self.hedge_ratio = ratio
+
+        z_score = self.hedge.residual_zscore(leg_a, self.hedge_ratio, mid_a, mid_b)
+        pos_a, pos_b = positions.get(leg_a, 0), positions.get(leg_b, 0)
+
+        if z_score > self.entry_threshold:
+            # Spread too high - sell A, buy B
+            self._enter(-1, pos_a, pos_b, market)
+        elif z_score < -self.entry_threshold:
+            # Spread too low - buy A, sell B
+            self._enter(1, pos_a, pos_b, market)
+        elif abs(z_score) < self.exit_threshold:
+            # Spread normalized - unwind both legs
+            exit_b = max(1, round(self.exit_size * self.hedge_ratio))
+            self._close(leg_a, pos_a, self.exit_size, market)
+            self._close(leg_b, pos_b, exit_b, market)
+
+    def _enter(self, direction, pos_a, pos_b, market):
+        leg_a, leg_b = self.legs
+        room_a = self.max_positions[leg_a] - direction * pos_a
+        room_b = self.max_positions[leg_b] + direction * pos_b
+        size_a = min(self.order_size, room_a, int(room_b / self.hedge_ratio))
+        if size_a <= 0:
+            return
+        size_b = min(round(size_a * self.hedge_ratio), room_b)
+
+        book_a, book_b = market.books[leg_a], market.books[leg_b]
+        self.leg_orders[leg_a].add(leg_a, book_a.best_bid if direction > 0 else book_a.best_ask, direction * size_a)
+        if size_b > 0:
+            self.leg_orders[leg_b].add(leg_b, book_b.best_ask if direction > 0 else book_b.best_bid, -direction * size_b)
+
+    def _close(self, leg, position, size, market):
+        if abs(position) <= 5:
+            return
+        book = market.books[leg]
+        if position > 0:
+            self.leg_orders[leg].add(leg, book.best_ask, -min(size, position))
+        else:
+            self.leg_orders[leg].add(leg, book.best_bid, min(size, -position))
+
+class BasketEngine:
+    """Fair values of every index product, computed once per tick.
+
+    ``add_index`` registers an index's ``{component: weight}``. ``update``
+    prices every index once per ``MarketSnapshot`` as the weighted mean of
+    its quoted components' mids. ``fair``, ``premium`` (the index mid less
+    its fair value, NaN while the index is unquoted) and ``hedgeable``
+    (every component listed) are lists indexed by row. ``size_hedge`` sizes
+    an index trade and its hedge legs within the components' position limits,
+    less what ``reserve`` has already set aside for other indices this tick.
+    """
+    def __init__(self):
+        self.indices = []
+        self.components = []
+        self.legs = []
+        self.limits = {}
+        self.fair = []
+        self.premium = []
+        self.hedgeable = []
+        # {(component, direction): qty} of hedge legs already sent this tick.
+        self.reserved = {}
+        self._last_market = None
+
+    def add_index(self, name, weights):
+        """Register index ``name`` with {component: weight}; returns its row."""
+        for component in weights:
+            if component not in self.components:
+                self.components.append(component)
+        self.indices.append(name)
+        self.legs.append(list(weights.items()))
+        self.fair.append(0)
+        self.premium.append(math.nan)
+        self.hedgeable.append(False)
+        return len(self.indices) - 1
+
+    def set_limits(self, limits):
+        self.limits = dict(limits)
+
+    def update(self, market):
+        if market is self._last_market:
+            return
+        self._last_market = market
+        self.reserved.clear()
+        mids = market.mid
+        books = market.books
+        for row, legs in enumerate(self.legs):
+            price = 0
+            total_weight = 0
+            listed = True
+            for component, weight in legs:
+                mid = mids.get(component)
+                if mid is not None:
+                    price += weight * mid
+                    total_weight += weight
+                elif component not in books:
+                    listed = False
+            fair = price / total_weight if total_weight > 0 else 0
+            index_mid = mids.get(self.indices[row])
+            self.fair[row] = fair
+            self.premium[row] = index_mid - fair if index_mid is not None else math.nan
+            self.hedgeable[row] = listed
+
+    def size_hedge(self, row, unit, direction, positions):
+        """``(units, [(component, qty)])`` for trading up to ``unit`` of index ``row``.
+
+        ``direction`` is +1 to buy the components and -1 to sell them. Each leg
+        is max(1, int(weight * units)). ``units`` is the largest number up to
+        ``unit`` whose legs all fit in the room left under the components'
+        position limits after the legs reserved this tick, so the index is
+        never traded without its full hedge, even once every strategy's orders
+        are netted; it is 0 when even one unit cannot be hedged.
+        """
+        legs = self.legs[row]
+        units = unit
+        reserved = self.reserved
+        for component, weight in legs:
+            room = (self.limits.get(component, math.inf) - direction * positions.get(component, 0)
+                    - reserved.get((component, direction), 0))
+            if room < 1:
+                return 0, []
+            if int(weight * units) > room:
+                # int(weight * u) <= room roughly means u < (room + 1) / weight; start one above.
+                units = min(units, int((room + 1) / weight) + 1)
+                while units > 0 and int(weight * units) > room:
+                    units -= 1
+        if units <= 0:
+            return 0, []
+        return units, [(component, direction * max(1, int(weight * units))) for component, weight in legs]
+
+    def reserve(self, legs):
+        """Set aside the room ``legs`` ([(component, qty)]) take for the rest of the tick."""
+        reserved = self.reserved
+        for component, qty in legs:
+            key = (component, 1 if qty > 0 else -1)
+            reserved[key] = reserved.get(key, 0) + abs(qty)
+
 class IndexStrategy(BaseClass):
-    def __init__(self, name, max_position, weights):
+    state_attrs = ('fair_value_history',)
+
+    def __init__(self, name, max_position, weights, vol_window=50, vol_multiplier=2.0, min_threshold=1.0,
+                 max_unit=15, basket=None):
         super().__init__(name, max_position)
         self.weights = weights
-        self.price_history = deque(maxlen=100)
-        self.fair_value_history = deque(maxlen=50)
-
-    def compute_fair_value(self, state):
-        price = 0
-        total_weight = 0
-        for prod, weight in self.weights.items():
-            orderbook = state.order_depth.get(prod)
-            if orderbook and orderbook.buy_orders and orderbook.sell_orders:
-                mid = (max(orderbook.buy_orders.keys()) + min(orderbook.sell_orders.keys())) / 2
-                price += weight * mid
-                total_weight += weight
-        return price / total_weight if total_weight > 0 else 0
-
-    def get_orders(self, state, orderbook, position):
-        orders = []
-        fair = self.compute_fair_value(state)
+        self.vol_multiplier = vol_multiplier
+        self.min_threshold = min_threshold
+        self.max_unit = max_unit
+        self.fair_value_history = RollingWindow(vol_window)
+        self.basket = basket if basket is not None else BasketEngine()
+        self.row = self.basket.add_index(name, weights)
+
+    def depends_on(self):
+        return {self.product_name, *self.weights}
+
+    def compute_fair_value(self, market):
+        self.basket.update(market)
+        return self.basket.fair[self.row]
+
+    def get_orders(self, state, orderbook, position, market):
+        orders = self.new_orders()
+        fair = self.compute_fair_value(market)
         
         if fair == 0:
             return orders
             
-        best_bid = max(orderbook.buy_orders.keys()) if orderbook.buy_orders else None
-        best_ask = min(orderbook.sell_orders.keys()) if orderbook.sell_orders else None
+        best_bid = orderbook.best_bid
+        best_ask = orderbook.best_ask
 
         if best_bid is None or best_ask is None:
             return orders
 
-        mid = (best_bid + best_ask) / 2
-        self.price_history.append(mid)
         self.fair_value_history.append(fair)
 
-        premium = mid - fair
+        premium = self.basket.premium[self.row]
         
         # Dynamic threshold based on recent volatility
         if len(self.fair_value_history) > 20:
-            fair_vol = stdev(self.fair_value_history)
-            threshold = max(1.0, fair_vol * 2.0)
+            fair_vol = self.fair_value_history.stdev()
+            threshold = max(self.min_threshold, fair_vol * self.vol_multiplier)
         else:
             threshold = 2.0
         
         # Larger position sizes for index arbitrage
-        unit = min(15, self.max_position // 3)
+        unit = min(self.max_unit, self.max_position // 3)
         
-        # Check if we have enough capital for hedging
-        can_hedge = True
-        for prod in self.weights.keys():
-            if prod not in state.order_depth:
-                can_hedge = False
-                break
-        
-        if not can_hedge:
+        # Check if every component is listed for hedging
+        if not self.basket.hedgeable[self.row]:
             return orders
 
+        positions = getattr(state, 'positions', {})
         if premium > threshold and position > -self.max_position:
             # Index overpriced - sell index, buy components
-            orders.append(Order(self.product_name, best_ask, -unit))
-            
-            # Hedge with components
-            for prod, weight in self.weights.items():
-                ref_ob = state.order_depth[prod]
-                if ref_ob.sell_orders:
-                    ask = min(ref_ob.sell_orders.keys())
-                    hedge_size = max(1, int(weight * unit))
-                    orders.append(Order(prod, ask, hedge_size))
-                    
+            self._trade(orders, best_ask, -1, min(unit, self.max_position + position), positions, market)
         elif premium < -threshold and position < self.max_position:
             # Index underpriced - buy index, sell components
-            orders.append(Order(self.product_name, best_bid, unit))
-            
-            # Hedge with components
-            for prod, weight in self.weights.items():
-                ref_ob = state.order_depth[prod]
-                if ref_ob.buy_orders:
-                    bid = max(ref_ob.buy_orders.keys())
-                    hedge_size = max(1, int(weight * unit))
-                    orders.append(Order(prod, bid, -hedge_size))
-        
+            self._trade(orders, best_bid, 1, min(unit, self.max_position - position), positions, market)
+
         return orders
 
+    def _trade(self, orders, price, side, unit, positions, market):
+        """Trade up to ``unit`` of the index on ``side`` with its hedge, or nothing.
+
+        The size is cut to what the components can hedge within their limits
+        and the legs other indices sent this tick, and the trade is skipped
+        when a component has no quote to hedge on. The legs sent are reserved
+        in the shared ``BasketEngine``.
+        """
+        units, legs = self.basket.size_hedge(self.row, unit, -side, positions)
+        if units <= 0:
+            return
+        hedges = []
+        for prod, hedge_size in legs:
+            book = market.books[prod]
+            hedge_price = book.best_ask if hedge_size > 0 else book.best_bid
+            if hedge_price is None:
+                return
+            hedges.append((prod, hedge_price, hedge_size))
+        orders.add(self.product_name, price, side * units)
+        for prod, hedge_price, hedge_size in hedges:
+            orders.add(prod, hedge_price, hedge_size)
+        self.basket.reserve(legs)
+
+def _take(level, size):
+    """Remove ``size`` from a ``{strategy: qty}`` price level, earliest strategy first."""
+    for strategy, qty in list(level.items()):
+        if size <= 0:
+            break
+        taken = min(qty, size)
+        size -= taken
+        if taken == qty:
+            del level[strategy]
+        else:
+            level[strategy] = qty - taken
+
+def _pass_through(symbol, orders, buffer, buy_room, sell_room):
+    """Copy one strategy's orders for ``symbol`` into ``buffer`` if netting would leave them as they are.
+
+    That is when they come from a single strategy, have at most one order
+    per price, do not cross each other and fit in the room on each side.
+    Returns False, with ``buffer`` untouched, otherwise.
+    """
+    strategy = orders[0][3]
+    buys = []
+    sells = []
+    for _, price, qty, owner in orders:
+        if owner != strategy:
+            return False
+        if qty > 0:
+            buys.append((price, qty))
+            buy_room -= qty
+        else:
+            sells.append((price, qty))
+            sell_room += qty
+    if buy_room < 0 or sell_room < 0:
+        return False
+    if len(buys) > 1:
+        buys.sort(reverse=True)
+    if len(sells) > 1:
+        sells.sort()
+    if buys and sells and buys[0][0] >= sells[0][0]:
+        return False
+    for side in (buys, sells):
+        for k in range(1, len(side)):
+            if side[k][0] == side[k - 1][0]:
+                return False
+    for price, qty in buys:
+        buffer.add(symbol, price, qty, strategy)
+    for price, qty in sells:
+        buffer.add(symbol, price, qty, strategy)
+    return True
+
+def net_orders(batches, positions, limits, buffers, default_limit=50):
+    """Net every strategy's orders into one book per product.
+
+    Orders are summed per product, side, price and strategy. Our own buys
+    and sells that would cross each other are cancelled best against best,
+    so the orders sent never trade with each other. Each side is then cut to
+    the room left under the product's limit, keeping the best-priced orders.
+    Within a price, cancelled and cut volume comes out of the strategies in
+    the order they quoted it, and what is left goes out as one order per
+    strategy, tagged with its id. Results are written into ``buffers``
+    ({product: OrderBuffer}, cleared first), buys best first then sells.
+    A product whose orders netting would not change is copied straight
+    across (see ``_pass_through``).
+    """
+    for buffer in buffers.values():
+        buffer.clear()
+    pending = {}
+    for batch in batches:
+        for order in batch.tagged():
+            if order[2]:
+                orders = pending.get(order[0])
+                if orders is None:
+                    pending[order[0]] = [order]
+                else:
+                    orders.append(order)
+
+    for symbol, orders in pending.items():
+        buffer = buffers.get(symbol)
+        if buffer is None:
+            buffer = buffers[symbol] = OrderBuffer()
+        position = positions.get(symbol, 0)
+        limit = limits.get(symbol, default_limit)
+        if _pass_through(symbol, orders, buffer, limit - position, limit + position):
+            continue
+
+        bids, asks = {}, {}
+        for _, price, qty, strategy in orders:
+            side = bids if qty > 0 else asks
+            level = side.get(price)
+            if level is None:
+                level = side[price] = {}
+            level[strategy] = level.get(strategy, 0) + abs(qty)
+
+        buys = sorted(bids.items(), reverse=True)
+        sells = sorted(asks.items())
+        i = j = 0
+        while i < len(buys) and j < len(sells) and buys[i][0] >= sells[j][0]:
+            bid, ask = buys[i][1], sells[j][1]
+            size = min(sum(bid.values()), sum(ask.values()))
+            _take(bid, size)
+            _take(ask, size)
+            if not bid:
+                i += 1
+            if not ask:
+                j += 1
+
+        for levels, room, sign in ((buys[i:], limit - position, 1), (sells[j:], limit + position, -1)):
+            for price, level in levels:
+                for strategy, qty in level.items():
+                    size = min(qty, room)
+                    if size <= 0:
+                        break
+                    buffer.add(symbol, price, sign * size, strategy)
+                    room -= size
+                if room <= 0:
+                    break
+    return buffers
+
+class Profiler:
+    """Opt-in per-product instrumentation for ``Trader.run``.
+
+    Times every ``get_orders`` call into a log-scale histogram (about 4%
+    wide buckets, so memory stays fixed however long the run), and counts
+    calls and orders emitted. With ``track_memory`` it also records how
+    many bytes tracemalloc's traced memory grew by over each call, net and
+    at its peak. These are byte sizes, not counts of allocations, and
+    tracing slows the run noticeably.
+    """
+    BUCKETS_PER_DOUBLING = 16
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stats = {}
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def call(self, product, get_orders, *args):
+        stats = self.stats.get(product)
+        if stats is None:
+            stats = self.stats[product] = {
+                'calls': 0, 'orders': 0, 'total_ns': 0, 'max_ns': 0, 'histogram': {},
+                'traced_net_bytes': 0, 'traced_peak_bytes': 0,
+            }
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter_ns()
+        orders = get_orders(*args)
+        elapsed = time.perf_counter_ns() - start
+
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stats['traced_net_bytes'] += current - before
+            stats['traced_peak_bytes'] = max(stats['traced_peak_bytes'], peak - before)
+        stats['calls'] += 1
+        stats['orders'] += len(orders)
+        stats['total_ns'] += elapsed
+        stats['max_ns'] = max(stats['max_ns'], elapsed)
+        bucket = int(math.log2(elapsed) * self.BUCKETS_PER_DOUBLING) if elapsed > 0 else 0
+        stats['histogram'][bucket] = stats['histogram'].get(bucket, 0) + 1
+        return orders
+
+    def _percentile(self, histogram, calls, q):
+        seen = 0
+        for bucket in sorted(histogram):
+            seen += histogram[bucket]
+            if seen >= q * calls:
+                return 2 ** ((bucket + 0.5) / self.BUCKETS_PER_DOUBLING)
+        return 0.0
+
+    def summary(self):
+        """Per-product figures in microseconds, slowest total first."""
+        report = {}
+        for product, stats in sorted(self.stats.items(), key=lambda item: -item[1]['total_ns']):
+            calls = stats['calls']
+            row = {
+                'calls': calls,
+                'orders': stats['orders'],
+                'total_ms': stats['total_ns'] / 1e6,
+                'mean_us': stats['total_ns'] / calls / 1e3,
+                'p50_us': self._percentile(stats['histogram'], calls, 0.50) / 1e3,
+                'p99_us': self._percentile(stats['histogram'], calls, 0.99) / 1e3,
+                'max_us': stats['max_ns'] / 1e3,
+            }
+            if self.track_memory:
+                row['traced_net_bytes'] = stats['traced_net_bytes']
+                row['traced_peak_bytes'] = stats['traced_peak_bytes']
+            report[product] = row
+        return report
+
+    def to_json(self, path=None):
+        text = json.dumps(self.summary(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
 class Trader:
     MAX_LIMIT = 0
 
-    def __init__(self):
+    def __init__(self, params=None, compact=False, profiler=None, net=True):
+        # params maps a product (or "LUXRAY/JOLTEON" for the pair) to keyword
+        # overrides for its strategy, e.g. {"ABRA": {"base_threshold": 1.5}};
+        # unset values keep the defaults.
+        # With compact=True run() returns the strategies' OrderBuffers as-is
+        # instead of converting them to lists of Order. A Profiler passed in
+        # times every get_orders call. With net=True the strategies' orders
+        # go through net_orders and come back keyed by the product traded.
+        params = params or {}
+        self.compact = compact
+        self.profiler = profiler
+        self.net = net
+        self._netted = {}
+        # BaseClass stand-ins for products no strategy trades, built once each.
+        self._fallbacks = {}
+        luxray_jolteon = PairStrategy("LUXRAY", 250, "JOLTEON", 350, **params.get("LUXRAY/JOLTEON", {}))
+        basket = BasketEngine()
+        self.features = FeatureCache()
         self.strategies = {
-            "SUDOWOODO": SudowoodoStrategy(),
-            "DROWZEE": DrowzeeStrategy(),
-            "ABRA": AbraStrategy(),
-            "SHINX": PairsTradingStrategy("SHINX", 60, "JOLTEON"),
-            "LUXRAY": PairsTradingStrategy("LUXRAY", 250, "JOLTEON"),
-            "JOLTEON": PairsTradingStrategy("JOLTEON", 350, "LUXRAY"),
-            "ASH": IndexStrategy("ASH", 60, {"LUXRAY": 0.6, "JOLTEON": 0.3, "SHINX": 0.1}),
-            "MISTY": IndexStrategy("MISTY", 100, {"LUXRAY": 0.67, "JOLTEON": 0.33}),
+            "SUDOWOODO": SudowoodoStrategy(**params.get("SUDOWOODO", {})),
+            "DROWZEE": DrowzeeStrategy(features=self.features, **params.get("DROWZEE", {})),
+            "ABRA": AbraStrategy(features=self.features, **params.get("ABRA", {})),
+            "SHINX": PairsTradingStrategy("SHINX", 60, "JOLTEON", **params.get("SHINX", {})),
+            "LUXRAY": luxray_jolteon,
+            "JOLTEON": luxray_jolteon,
+            "ASH": IndexStrategy("ASH", 60, {"LUXRAY": 0.6, "JOLTEON": 0.3, "SHINX": 0.1}, basket=basket,
+                                 **params.get("ASH", {})),
+            "MISTY": IndexStrategy("MISTY", 100, {"LUXRAY": 0.67, "JOLTEON": 0.33}, basket=basket,
+                                   **params.get("MISTY", {})),
             "PRODUCT": BaseClass("PRODUCT", 50),
         }
+        # Top of book per product and a counter bumped whenever it changes.
+        self.tops = {}
+        self.versions = {}
+        self._memo = {}
+        self._share_hedges()
+        # Names of the strategies, indexed by the id their orders carry.
+        self.strategy_names = []
+        for strategy in {id(s): s for s in self.strategies.values()}.values():
+            self._register(strategy)
+        basket.set_limits({c: self.strategies[c].position_limit(c) for c in basket.components if c in self.strategies})
+        self.limits = {product: strategy.position_limit(product) for product, strategy in self.strategies.items()}
+
+    def _register(self, strategy):
+        """Give ``strategy`` the next strategy id; its orders are tagged with it."""
+        for buffer in strategy.buffers():
+            buffer.owner = len(self.strategy_names)
+        self.strategy_names.append(f"{type(strategy).__name__}({strategy.product_name})")
+
+    def _share_hedges(self):
+        """Give pairs strategies trading the same two products one hedge estimator."""
+        shared = {}
+        for strategy in self.strategies.values():
+            if isinstance(strategy, PairsTradingStrategy):
+                key = (frozenset((strategy.product_name, strategy.pair_name)), strategy.hedge_window)
+                strategy.hedge = shared.setdefault(key, strategy.hedge)
+
+    # Bumped whenever the layout of get_state changes.
+    STATE_VERSION = 5
+
+    def get_state(self, products=None):
+        """Warm-up state of the feature cache and every strategy, keyed by strategy name.
+
+        With ``products`` (such as one of ``product_groups``) only the
+        strategies trading them and their features are included.
+        """
+        unique = {id(strategy): strategy for product, strategy in self.strategies.items()
+                  if products is None or product in products}
+        return {
+            'features': self.features.get_state(products),
+            'strategies': {strategy.product_name: strategy.get_state() for strategy in unique.values()},
+        }
+
+    def set_state(self, state):
+        """Restore ``get_state`` output; strategies missing from it keep their state."""
+        self.features.set_state(state['features'])
+        for strategy in {id(s): s for s in self.strategies.values()}.values():
+            if strategy.product_name in state['strategies']:
+                strategy.set_state(state['strategies'][strategy.product_name])
+
+    def save_state(self, path):
+        """Write ``get_state`` to ``path`` so a new Trader can resume without warm-up."""
+        with open(path, 'wb') as f:
+            pickle.dump((self.STATE_VERSION, self.get_state()), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_state(self, path):
+        with open(path, 'rb') as f:
+            version, state = pickle.load(f)
+        if version != self.STATE_VERSION:
+            raise ValueError(f"checkpoint version {version}, expected {self.STATE_VERSION}")
+        self.set_state(state)
+
+    def product_groups(self):
+        """Partition the traded products into groups no strategy reads across.
+
+        Products are linked whenever one strategy depends on both, so a pair
+        and an index land in one group with all of their legs. Each group can
+        be evaluated apart from the others with identical orders.
+        """
+        groups = []
+        for product, strategy in self.strategies.items():
+            linked = {product, *strategy.depends_on()}
+            for group in [g for g in groups if g & linked]:
+                groups.remove(group)
+                linked |= group
+            groups.append(linked)
+        return [sorted(group) for group in groups]
+
+    def _bump_versions(self, market):
+        for product, book in market.books.items():
+            top = (book.best_bid, book.bid_volume, book.best_ask, book.ask_volume)
+            if self.tops.get(product) != top:
+                self.tops[product] = top
+                self.versions[product] = self.versions.get(product, 0) + 1
 
     def run(self, state):
         positions = getattr(state, 'positions', {})
         order_depth = getattr(state, 'order_depth', {})
+        market = MarketSnapshot(order_depth)
 
         if len(order_depth) == 1 and "PRODUCT" in order_depth:
             product = "PRODUCT"
             strategy = self.strategies[product]
             current_position = positions.get(product, 0)
-            product_orders = strategy.get_orders(state, order_depth[product], current_position)
+            product_orders = strategy.get_orders(state, market.books[product], current_position, market)
             self.MAX_LIMIT = strategy.max_position
-            return product_orders, self.MAX_LIMIT
+            return product_orders if self.compact else product_orders.to_orders(), self.MAX_LIMIT
 
+        self.features.update(market)
+        self._bump_versions(market)
         result = {}
-        for product, orderbook in order_depth.items():
+        profiler = self.profiler
+        for product in order_depth:
             current_position = positions.get(product, 0)
-            strategy = self.strategies.get(product, BaseClass(product, 50))
-            result[product] = strategy.get_orders(state, orderbook, current_position)
+            strategy = self.strategies.get(product)
+            if strategy is None:
+                strategy = self._fallbacks.get(product)
+                if strategy is None:
+                    strategy = self._fallbacks[product] = BaseClass(product, 50)
+                    self._register(strategy)
+            if strategy.stateless:
+                key = (current_position, tuple(self.versions[p] if p in market.books else None
+                                               for p in strategy.depends_on()))
+                memo = self._memo.get(product)
+                if memo is not None and memo[0] == key:
+                    result[product] = memo[1]
+                    continue
+            if profiler is None:
+                result[product] = strategy.get_orders(state, market.books[product], current_position, market)
+            else:
+                result[product] = profiler.call(product, strategy.get_orders,
+                                                state, market.books[product], current_position, market)
+            if strategy.stateless:
+                self._memo[product] = (key, result[product])
+
+        if self.net:
+            netted = net_orders(result.values(), positions, self.limits, self._netted)
+            result = {product: netted.setdefault(product, OrderBuffer()) for product in order_depth}
 
+        if not self.compact:
+            result = {product: orders.to_orders() for product, orders in result.items()}
         return result, self.MAX_LIMIT
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""Replay price dumps through the Week 4-5 Trader.
+
+Price CSVs are the semicolon-separated dumps with one row per product and
+timestamp and up to three levels a side (``bid_price_1``, ``bid_volume_1``,
+..., ``ask_volume_3``). Orders returned by ``Trader.run`` are filled against
+the same tick's book, level by level, and clipped to each product's
+``max_position``.
+
+A backtest is a chain of generators, so a session of any length runs in
+constant memory when the source streams:
+
+    source (stream_prices / TickStore)
+      -> strategy_stage  (timestamp, order_depth, orders, strategies)
+      -> fill_stage      (timestamp, order_depth, orders, fills, strategies)
+      -> sinks           e.g. Metrics, updated one event at a time
+
+``strategies`` holds the id (``Trader.strategy_names``) of the strategy
+behind each order, or None where the trader does not say; after the fill
+stage it is an ``(orders, fills)`` pair of such lists.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+from itertools import groupby
+
+DEFAULT_LIMIT = 50
+DAY_LENGTH = 1_000_000
+
+
+class Book:
+    """Order depth for one product; the strategies only read these two dicts."""
+    def __init__(self, buy_orders, sell_orders):
+        self.buy_orders = buy_orders
+        self.sell_orders = sell_orders
+
+
+class State:
+    def __init__(self, timestamp, order_depth, positions):
+        self.timestamp = timestamp
+        self.order_depth = order_depth
+        self.positions = positions
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _parse_row(row):
+    buy_orders, sell_orders = {}, {}
+    for level in (1, 2, 3):
+        price, volume = row.get(f'bid_price_{level}'), row.get(f'bid_volume_{level}')
+        if price and volume:
+            buy_orders[_number(price)] = abs(_number(volume))
+        price, volume = row.get(f'ask_price_{level}'), row.get(f'ask_volume_{level}')
+        if price and volume:
+            sell_orders[_number(price)] = -abs(_number(volume))
+    return int(row.get('day') or 0), int(row['timestamp']), Book(buy_orders, sell_orders)
+
+
+def load_prices(path):
+    """Return ``[(timestamp, {product: Book})]`` in time order.
+
+    Timestamps of later days are offset by ``DAY_LENGTH`` so a multi-day dump
+    replays as one session. Ask volumes are stored negative, as in
+    ``OrderBook.sell_orders``.
+    """
+    ticks = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            day, timestamp, book = _parse_row(row)
+            ticks.setdefault((day, timestamp), {})[row['product']] = book
+
+    if not ticks:
+        return []
+    first_day = min(day for day, _ in ticks)
+    return [((day - first_day) * DAY_LENGTH + timestamp, depth)
+            for (day, timestamp), depth in sorted(ticks.items())]
+
+
+def stream_prices(path):
+    """Like ``load_prices`` but yields one tick at a time from a CSV already in time order."""
+    first_day = None
+    with open(path, newline='') as f:
+        parsed = ((row['product'], _parse_row(row)) for row in csv.DictReader(f, delimiter=';'))
+        for (day, timestamp), rows in groupby(parsed, key=lambda item: item[1][:2]):
+            if first_day is None:
+                first_day = day
+            yield (day - first_day) * DAY_LENGTH + timestamp, {product: book for product, (_, _, book) in rows}
+
+
+def open_ticks(path, stream=False):
+    """The ticks at ``path``: a memory-mapped ``TickStore`` for a directory, else the CSV's ticks.
+
+    A CSV is parsed up front with ``load_prices``, or with ``stream=True``
+    read a tick at a time by ``stream_prices``, which can be iterated once.
+    """
+    if os.path.isdir(path):
+        from tickstore import TickStore
+        return TickStore(path)
+    return stream_prices(path) if stream else load_prices(path)
+
+
+def fork_context():
+    """``multiprocessing`` context that forks where available, so workers inherit the parent's ticks."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+def position_limits(trader):
+    return {product: strategy.position_limit(product) for product, strategy in trader.strategies.items()}
+
+
+def flatten_orders(result):
+    """``(symbol, price, quantity)`` of every order in a ``Trader.run`` result, in emission order.
+
+    Accepts lists of ``Order`` as well as the ``OrderBuffer``s a compact
+    ``Trader`` returns.
+    """
+    if isinstance(result, tuple):
+        result = result[0]
+    batches = result.values() if isinstance(result, dict) else [result]
+    flat = []
+    for batch in batches:
+        if isinstance(batch, list):
+            flat.extend((order.symbol, order.price, order.quantity) for order in batch)
+        else:
+            flat.extend(batch)
+    return flat
+
+
+def order_strategies(result):
+    """Strategy id of each order ``flatten_orders(result)`` gives, or None for plain ``Order``s."""
+    if isinstance(result, tuple):
+        result = result[0]
+    batches = result.values() if isinstance(result, dict) else [result]
+    strategies = []
+    for batch in batches:
+        strategies.extend([None] * len(batch) if isinstance(batch, list) else batch.strategies)
+    return strategies
+
+
+def match_orders(orders, order_depth, positions, limits, taken=None, sources=None):
+    """Fill ``(symbol, price, quantity)`` orders against the books of one tick.
+
+    Each order walks the opposite side from the best level while its limit
+    price allows, sharing the displayed volume with earlier orders in the
+    same tick. Returns ``[(product, price, qty)]`` and updates ``positions``.
+    Pass the same ``taken`` dict to match one tick's orders in several calls.
+    Pass a list as ``sources`` to get the index in ``orders`` of each fill's
+    order appended to it.
+    """
+    fills = []
+    taken = {} if taken is None else taken
+    for index, (product, limit_price, qty) in enumerate(orders):
+        book = order_depth.get(product)
+        if book is None or qty == 0:
+            continue
+        position = positions.get(product, 0)
+        limit = limits.get(product, DEFAULT_LIMIT)
+        if qty > 0:
+            remaining = min(qty, limit - position)
+            levels = sorted(book.sell_orders.items())
+            crosses = lambda price: price <= limit_price
+        else:
+            remaining = min(-qty, limit + position)
+            levels = sorted(book.buy_orders.items(), reverse=True)
+            crosses = lambda price: price >= limit_price
+
+        for price, volume in levels:
+            if remaining <= 0 or not crosses(price):
+                break
+            available = abs(volume) - taken.get((product, price), 0)
+            size = min(remaining, available)
+            if size <= 0:
+                continue
+            taken[(product, price)] = taken.get((product, price), 0) + size
+            remaining -= size
+            signed = size if qty > 0 else -size
+            position += signed
+            fills.append((product, price, signed))
+            if sources is not None:
+                sources.append(index)
+        positions[product] = position
+    return fills
+
+
+def strategy_stage(trader, ticks, positions):
+    """Run ``trader`` on each tick, reading the live ``positions`` the fill stage keeps."""
+    for timestamp, order_depth in ticks:
+        state = State(timestamp, order_depth, dict(positions))
+        result = trader.run(state)
+        yield timestamp, order_depth, flatten_orders(result), order_strategies(result)
+
+
+def fill_stage(events, positions, limits):
+    for timestamp, order_depth, orders, strategies in events:
+        sources = []
+        fills = match_orders(orders, order_depth, positions, limits, sources=sources)
+        yield timestamp, order_depth, orders, fills, (strategies, [strategies[i] for i in sources])
+
+
+class Metrics:
+    """Running position, PnL and order statistics over a fill stream.
+
+    Holds a few numbers per product and nothing per tick. Realized PnL is
+    booked against the average entry price whenever a position is reduced;
+    unrealized PnL marks what is left to the last known mid.
+    """
+    def __init__(self):
+        self.positions = {}
+        self.entry = {}
+        self.cash = {}
+        self.realized = {}
+        self.marks = {}
+        self.ticks = 0
+        self.orders = 0
+        self.fills = 0
+        self.pnl = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+
+    def update(self, timestamp, order_depth, orders, fills, strategies=None):
+        self.ticks += 1
+        self.orders += len(orders)
+        self.fills += len(fills)
+        for product, price, qty in fills:
+            self._book_fill(product, price, qty)
+
+        for product, book in order_depth.items():
+            if book.buy_orders and book.sell_orders:
+                self.marks[product] = (max(book.buy_orders) + min(book.sell_orders)) / 2
+        self.pnl = sum(self.cash.values()) + sum(
+            qty * self.marks.get(product, 0) for product, qty in self.positions.items())
+        self.peak = max(self.peak, self.pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.pnl)
+
+    def _book_fill(self, product, price, qty):
+        self.cash[product] = self.cash.get(product, 0) - price * qty
+        position = self.positions.get(product, 0)
+        entry = self.entry.get(product, 0.0)
+        if position == 0 or (position > 0) == (qty > 0):
+            entry = (entry * abs(position) + price * abs(qty)) / (abs(position) + abs(qty))
+        else:
+            closed = min(abs(qty), abs(position))
+            direction = 1 if position > 0 else -1
+            self.realized[product] = self.realized.get(product, 0) + closed * (price - entry) * direction
+            if abs(qty) > abs(position):
+                entry = price
+            elif abs(qty) == abs(position):
+                entry = 0.0
+        self.positions[product] = position + qty
+        self.entry[product] = entry
+
+    def unrealized(self, product):
+        position = self.positions.get(product, 0)
+        return position * (self.marks.get(product, 0) - self.entry.get(product, 0.0)) if position else 0.0
+
+    def summary(self):
+        products = sorted(set(self.cash) | set(self.positions))
+        realized = sum(self.realized.values())
+        unrealized = sum(self.unrealized(product) for product in products)
+        return {
+            'pnl': self.pnl,
+            'realized_pnl': realized,
+            'unrealized_pnl': unrealized,
+            'max_drawdown': self.max_drawdown,
+            'product_pnl': {p: self.cash.get(p, 0) + self.positions.get(p, 0) * self.marks.get(p, 0)
+                            for p in products},
+            'positions': dict(self.positions),
+            'ticks': self.ticks,
+            'orders': self.orders,
+            'fills': self.fills,
+        }
+
+
+def run_pipeline(trader, ticks, sinks):
+    """Drive ``ticks`` through the strategy and fill stages into every sink."""
+    positions = {}
+    events = fill_stage(strategy_stage(trader, ticks, positions), positions, position_limits(trader))
+    for event in events:
+        for sink in sinks:
+            sink.update(*event)
+    return sinks
+
+
+def run_backtest(trader, ticks):
+    """Replay ``ticks`` through ``trader`` and return PnL and drawdown figures.
+
+    PnL is cash plus positions marked to the last known mid of each product;
+    drawdown is the largest peak-to-trough fall of total PnL over the session.
+    """
+    metrics = Metrics()
+    run_pipeline(trader, ticks, [metrics])
+    return metrics.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the Week 4-5 Trader on a price dump.')
+    parser.add_argument('prices', help='price CSV or tick store directory')
+    parser.add_argument('--profile', metavar='JSON', help='write per-product get_orders timings here')
+    parser.add_argument('--memory', action='store_true',
+                        help='also record the bytes of traced memory each call adds (slow)')
+    parser.add_argument('--journal', metavar='PATH', help='record every order and fill here (see journal.py)')
+    args = parser.parse_args()
+
+    from Strategy import Profiler, Trader
+    profiler = Profiler(track_memory=args.memory) if args.profile else None
+    ticks = open_ticks(args.prices, stream=True)
+
+    trader = Trader(compact=True, profiler=profiler)
+    if args.journal:
+        from journal import JournalWriter
+        metrics = Metrics()
+        with JournalWriter(args.journal, trader) as journal:
+            run_pipeline(trader, ticks, [metrics, journal])
+        result = metrics.summary()
+    else:
+        result = run_backtest(trader, ticks)
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+    if profiler is not None:
+        profiler.to_json(args.profile)
+        print(f"{'':>15}  timings written to {args.profile}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Binary journal of a backtest's orders and fills, and a diff of two journals.
+
+    python backtest.py prices.csv --journal before.jrnl
+    python backtest.py prices.csv --journal after.jrnl
+    python journal.py diff before.jrnl after.jrnl
+    python journal.py info after.jrnl
+
+A journal is append-only: a 32-byte header, then one 32-byte record per
+order and per fill, in the order the backtest produced them:
+
+    timestamp  int64    session timestamp
+    price      float64
+    quantity   int32    negative for sells
+    product    uint16   index into the names file
+    strategy   uint16   index into the names file: the strategy that
+                        emitted the order (or the order a fill filled)
+    kind       uint8    0 = order, 1 = fill
+    (7 bytes of zero padding)
+
+Product and strategy names go to ``<journal>.json`` beside it. The file is
+rewritten whenever a new name is seen. ``JournalWriter`` is a sink for
+``backtest.run_pipeline``, whose events carry each order's strategy id.
+The loop only appends tuples to a list; full batches are packed and
+written by a background thread.
+
+``diff`` memory-maps both journals and compares them a chunk at a time, as
+four 64-bit words per record. It reports the first record that differs.
+"""
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b'SOCJRNL1'
+HEADER = struct.Struct('<8sII16x')
+ORDER, FILL = 0, 1
+KINDS = ('order', 'fill')
+RECORD = np.dtype([
+    ('timestamp', '<i8'),
+    ('price', '<f8'),
+    ('quantity', '<i4'),
+    ('product', '<u2'),
+    ('strategy', '<u2'),
+    ('kind', 'u1'),
+    ('pad', 'V7'),
+])
+FIELDS = ('timestamp', 'product', 'strategy', 'kind', 'price', 'quantity')
+
+
+class JournalWriter:
+    """Sink that appends every order and fill of a backtest to ``path``.
+
+    Give it the ``trader`` to name the strategies behind the ids in the
+    events (``Trader.strategy_names``); without it, or for events without
+    ids, the strategy is recorded as ``''``. ``batch`` records are packed
+    at a time. The background thread is allowed to fall ``depth`` batches
+    behind before the loop has to wait. Call ``close`` (or use it as a
+    context manager) to flush the journal.
+    """
+    def __init__(self, path, trader=None, batch=65536, depth=8):
+        self.path = path
+        self.batch = batch
+        self.names = {'products': [], 'strategies': []}
+        self._products = {}
+        self._strategies = {}
+        # Trader strategy id -> id in this journal.
+        self._tags = {}
+        self._strategy_names = trader.strategy_names if trader is not None else []
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, 1, RECORD.itemsize))
+        self._write_names()
+        self._records = []
+        self._error = None
+        self._queue = queue.Queue(depth)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_names(self):
+        with open(self.path + '.json', 'w') as f:
+            json.dump(self.names, f)
+
+    def _strategy_id(self, name):
+        if name not in self._strategies:
+            self._strategies[name] = len(self._strategies)
+            self.names['strategies'].append(name)
+            self._write_names()
+        return self._strategies[name]
+
+    def _product_id(self, product):
+        if product not in self._products:
+            self._products[product] = len(self._products)
+            self.names['products'].append(product)
+            self._write_names()
+        return self._products[product]
+
+    def _tag_id(self, tag):
+        known = tag is not None and tag < len(self._strategy_names)
+        self._tags[tag] = self._strategy_id(self._strategy_names[tag] if known else '')
+        return self._tags[tag]
+
+    def _drain(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                columns = list(zip(*records))
+                packed = np.zeros(len(records), RECORD)
+                for name, values in zip(FIELDS, columns):
+                    packed[name] = values
+                self._file.write(packed.tobytes())
+            except Exception as error:
+                self._error = error
+
+    def _flush(self):
+        if self._error is not None:
+            raise self._error
+        if self._records:
+            self._queue.put(self._records)
+            self._records = []
+
+    def update(self, timestamp, order_depth, orders, fills, strategies=None):
+        ids = self._products
+        tags = self._tags
+        append = self._records.append
+        if strategies is None:
+            strategies = ([None] * len(orders), [None] * len(fills))
+        for kind, batch, batch_tags in ((ORDER, orders, strategies[0]), (FILL, fills, strategies[1])):
+            for (product, price, qty), tag in zip(batch, batch_tags):
+                product_id = ids[product] if product in ids else self._product_id(product)
+                strategy_id = tags[tag] if tag in tags else self._tag_id(tag)
+                append((timestamp, product_id, strategy_id, kind, price, qty))
+        if len(self._records) >= self.batch:
+            self._flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+
+
+class Journal:
+    """Read-only, memory-mapped view of a journal."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or size != RECORD.itemsize:
+            raise ValueError(f"{path} is not a version {version} journal with {RECORD.itemsize}-byte records")
+        with open(path + '.json') as f:
+            self.names = json.load(f)
+        # A writer that was killed may have left part of a record behind.
+        count = (os.path.getsize(path) - HEADER.size) // RECORD.itemsize
+        self.records = np.memmap(path, RECORD, 'r', HEADER.size, (count,)) if count else np.zeros(0, RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def describe(self, i):
+        """Record ``i`` as a dict with product and strategy names."""
+        record = self.records[i]
+        return {
+            'record': i,
+            'timestamp': int(record['timestamp']),
+            'kind': KINDS[record['kind']],
+            'product': self.names['products'][record['product']],
+            'strategy': self.names['strategies'][record['strategy']],
+            'price': float(record['price']),
+            'quantity': int(record['quantity']),
+        }
+
+    def events(self):
+        """``(timestamp, orders, fills)`` per timestamp, with ``(product, price, qty)`` entries."""
+        products = self.names['products']
+        records = self.records
+        if not len(records):
+            return
+        bounds = np.flatnonzero(np.diff(records['timestamp'])) + 1
+        for start, end in zip([0, *bounds.tolist()], [*bounds.tolist(), len(records)]):
+            chunk = records[start:end]
+            entries = zip(chunk['kind'].tolist(), chunk['product'].tolist(), chunk['price'].tolist(),
+                          chunk['quantity'].tolist())
+            orders, fills = [], []
+            for kind, product, price, qty in entries:
+                (fills if kind == FILL else orders).append((products[product], price, qty))
+            yield int(chunk['timestamp'][0]), orders, fills
+
+
+def _translation(names, into):
+    """``uint16`` array mapping ids in ``names`` to ids in ``into`` (unknown names get fresh ids)."""
+    ids = {name: i for i, name in enumerate(into)}
+    fresh = iter(range(len(into), 1 << 16))
+    return np.array([ids[name] if name in ids else next(fresh) for name in names] or [0], dtype=np.uint16)
+
+
+def diff(a, b, chunk=1 << 20):
+    """Index of the first record where journals ``a`` and ``b`` differ, or ``None`` if they are equal.
+
+    Records are compared by product and strategy name, not by id. If one
+    journal is a prefix of the other, the first missing record differs.
+    """
+    a, b = (Journal(j) if isinstance(j, str) else j for j in (a, b))
+    remap = {'product': _translation(b.names['products'], a.names['products']),
+             'strategy': _translation(b.names['strategies'], a.names['strategies'])}
+    identity = all(np.array_equal(table, np.arange(len(table))) for table in remap.values())
+    n = min(len(a), len(b))
+    for start in range(0, n, chunk):
+        left = a.records[start:start + chunk]
+        right = b.records[start:start + chunk]
+        if not identity:
+            right = np.array(right)
+            for field, table in remap.items():
+                right[field] = table[right[field]]
+        unequal = (left.view('<u8').reshape(-1, 4) != right.view('<u8').reshape(-1, 4)).any(axis=1)
+        if unequal.any():
+            return start + int(unequal.argmax())
+    return None if len(a) == len(b) else n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff_cmd = commands.add_parser('diff', help='report the first record where two journals differ')
+    diff_cmd.add_argument('a')
+    diff_cmd.add_argument('b')
+    info_cmd = commands.add_parser('info', help='summarize a journal')
+    info_cmd.add_argument('journal')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        journal = Journal(args.journal)
+        kinds = np.bincount(journal.records['kind'], minlength=2) if len(journal) else [0, 0]
+        print(f"{len(journal)} records ({kinds[ORDER]} orders, {kinds[FILL]} fills), "
+              f"{len(journal.names['products'])} products, {len(journal.names['strategies'])} strategies")
+        return
+
+    a, b = Journal(args.a), Journal(args.b)
+    first = diff(a, b)
+    if first is None:
+        print(f"identical: {len(a)} records")
+        return
+    print(f"first difference at record {first} of {len(a)} / {len(b)}")
+    for label, journal in (('a', a), ('b', b)):
+        found = journal.describe(first) if first < len(journal) else '(end of journal)'
+        print(f"{label:>3}: {found}")
+    raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Drive the Week 4-5 Trader from a live market-data stream with asyncio.
+
+    python live.py prices.csv --rate 20000 --budget-ms 1
+    python live.py store/ --rate 0             # publish as fast as possible
+
+``SimulatedExchange`` is an in-process stand-in for the exchange, built on
+``asyncio.Queue``s. It publishes one update per product and tick on
+``feed`` on a schedule of ``rate`` ticks per second, whether or not the
+driver keeps up. It matches the order batches it
+receives on ``orders`` against its current books with
+``backtest.match_orders`` and reports fills on ``fills``.
+
+``LiveDriver`` keeps only the latest book per product. Each time it wakes
+up it drains everything that arrived, so a book replaced before it was
+evaluated is counted as superseded and never traded on. The trader then
+runs once on the newest snapshot of every product. Each evaluation has a
+deadline of ``budget`` seconds after the oldest of the updates it consumes
+(only the newest update per product counts):
+
+* if the deadline has already passed before ``Trader.run`` starts, the
+  snapshot is stale and is skipped;
+* if ``Trader.run`` finishes after the deadline, the miss is reported and
+  the orders are dropped (unless ``send_late``).
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+
+from backtest import State, flatten_orders, match_orders, open_ticks, position_limits
+
+MAX_BURST = 0.001
+
+
+class SimulatedExchange:
+    def __init__(self, ticks, limits, rate=None):
+        self.ticks = ticks
+        self.limits = limits
+        self.rate = rate
+        self.feed = asyncio.Queue()
+        self.orders = asyncio.Queue()
+        self.fills = asyncio.Queue()
+        self.books = {}
+        self.positions = {}
+        self.filled = 0
+
+    async def publish(self):
+        """Send every tick as per-product ``(timestamp, product, book, sent_at)`` updates, then ``None``.
+
+        Ticks fall due on a fixed schedule, whether or not the driver keeps up.
+        Ticks that fell due while the loop was busy go out in one burst,
+        stamped with the time they were due; a burst yields to the driver at
+        least every ``MAX_BURST`` seconds. asyncio timers are only about a
+        millisecond fine, so above ~1000 ticks/s ticks arrive in bursts.
+        """
+        loop = asyncio.get_running_loop()
+        start = yielded = loop.time()
+        for i, (timestamp, order_depth) in enumerate(self.ticks):
+            if self.rate:
+                sent_at = start + i / self.rate
+                now = loop.time()
+                if sent_at > now:
+                    await asyncio.sleep(sent_at - now)
+                    yielded = loop.time()
+                elif now - yielded > MAX_BURST:
+                    await asyncio.sleep(0)
+                    yielded = loop.time()
+            else:
+                await asyncio.sleep(0)
+                sent_at = loop.time()
+            self.books.update(order_depth)
+            for product, book in order_depth.items():
+                self.feed.put_nowait((timestamp, product, book, sent_at))
+        self.feed.put_nowait(None)
+
+    async def match(self):
+        """Fill order batches against the books as they are now, until ``None`` arrives."""
+        while True:
+            orders = await self.orders.get()
+            if orders is None:
+                return
+            fills = match_orders(orders, self.books, self.positions, self.limits)
+            if fills:
+                self.filled += len(fills)
+                self.fills.put_nowait(fills)
+
+
+class LiveStats:
+    """Counters for a live run.
+
+    Latency and run-time percentiles are taken over the last ``window``
+    evaluations, so a long-running session keeps a fixed amount of memory.
+    """
+    def __init__(self, window=100_000):
+        self.updates = 0
+        self.superseded = 0
+        self.evaluations = 0
+        self.stale = 0
+        self.missed = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)
+        self.run_times = deque(maxlen=window)
+
+    def summary(self):
+        def pick(values, q):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))] * 1e6 if values else 0.0
+        return {
+            'updates': self.updates,
+            'superseded': self.superseded,
+            'evaluations': self.evaluations,
+            'stale_skipped': self.stale,
+            'missed_deadlines': self.missed,
+            'order_batches': self.batches,
+            'latency_p50_us': pick(self.latencies, 0.50),
+            'latency_p99_us': pick(self.latencies, 0.99),
+            'run_p50_us': pick(self.run_times, 0.50),
+            'run_p99_us': pick(self.run_times, 0.99),
+        }
+
+
+class LiveDriver:
+    def __init__(self, trader, exchange, budget=0.005, send_late=False):
+        self.trader = trader
+        self.exchange = exchange
+        self.budget = budget
+        self.send_late = send_late
+        self.latest = {}
+        self.positions = {}
+        self.stats = LiveStats()
+
+    def _absorb(self, update, fresh):
+        timestamp, product, book, sent_at = update
+        self.stats.updates += 1
+        if product in fresh:
+            self.stats.superseded += 1
+        self.latest[product] = (timestamp, book)
+        fresh[product] = sent_at
+
+    def _apply_fills(self):
+        fills = self.exchange.fills
+        while not fills.empty():
+            for product, _, qty in fills.get_nowait():
+                self.positions[product] = self.positions.get(product, 0) + qty
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        feed = self.exchange.feed
+        stats = self.stats
+        finished = False
+        while not finished:
+            # Wait for one update, then take everything else already queued.
+            fresh = {}
+            update = await feed.get()
+            while update is not None:
+                self._absorb(update, fresh)
+                if feed.empty():
+                    break
+                update = feed.get_nowait()
+            finished = update is None
+            if not fresh:
+                continue
+
+            self._apply_fills()
+            deadline = min(fresh.values()) + self.budget
+            if loop.time() > deadline:
+                stats.stale += 1
+                continue
+
+            timestamp = max(ts for ts, _ in self.latest.values())
+            order_depth = {product: book for product, (_, book) in self.latest.items()}
+            start = time.perf_counter()
+            result = self.trader.run(State(timestamp, order_depth, dict(self.positions)))
+            stats.run_times.append(time.perf_counter() - start)
+            stats.evaluations += 1
+
+            done = loop.time()
+            stats.latencies.append(done - min(fresh.values()))
+            if done > deadline:
+                stats.missed += 1
+                if not self.send_late:
+                    continue
+            orders = flatten_orders(result)
+            if orders:
+                stats.batches += 1
+                self.exchange.orders.put_nowait(orders)
+            # Let the exchange match before the next snapshot is built.
+            await asyncio.sleep(0)
+        self.exchange.orders.put_nowait(None)
+
+
+async def run_live(trader, ticks, rate=None, budget=0.005, send_late=False):
+    """Run ``trader`` against a ``SimulatedExchange`` replaying ``ticks``; returns the driver's summary."""
+    exchange = SimulatedExchange(ticks, position_limits(trader), rate)
+    driver = LiveDriver(trader, exchange, budget, send_late)
+    await asyncio.gather(exchange.publish(), exchange.match(), driver.run())
+    driver._apply_fills()
+    summary = driver.stats.summary()
+    summary['fills'] = exchange.filled
+    summary['positions'] = dict(exchange.positions)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('prices', help='price CSV or tick store directory')
+    parser.add_argument('--rate', type=float, default=10000, help='ticks per second to publish; 0 for no pacing')
+    parser.add_argument('--budget-ms', type=float, default=5.0, help='latency budget per evaluation')
+    parser.add_argument('--send-late', action='store_true', help='send orders even after a missed deadline')
+    args = parser.parse_args()
+
+    from Strategy import Trader
+    # A CSV is parsed up front so that reading it does not slow the feed down.
+    ticks = open_ticks(args.prices)
+
+    summary = asyncio.run(run_live(Trader(compact=True), ticks, args.rate or None, args.budget_ms / 1e3,
+                                   args.send_late))
+    for key, value in summary.items():
+        print(f"{key:>17}: {value:.1f}" if isinstance(value, float) else f"{key:>17}: {value}")
+
+
+if __name__ == '__main__':
+    main()
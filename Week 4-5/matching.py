@@ -0,0 +1,226 @@
+"""Event-driven matching of the Trader's orders against the next tick's book.
+
+    python matching.py prices.csv            # queue-aware fills
+    python matching.py prices.csv --ttl 5    # let orders rest for five ticks
+
+``backtest.match_orders`` fills an order only against the same tick's book,
+so an order that joins or improves the best price never fills. Here orders
+sent at tick t rest in a per-product book (one heap per side, best price
+first, then arrival) and are matched when tick t+1 arrives:
+
+* an order whose price crosses the new opposite side takes its displayed
+  volume, level by level, as an aggressive order would;
+* otherwise the change between the two books is read as trade flow. The
+  volume that left the order's side at or above its price (below, for
+  sells) is consumed in price-time order: better levels first, then the
+  volume that was already queued at the order's price when it arrived,
+  then our earlier orders, then this one.
+
+Cancellations look like trades in L2 data, so passive fills are an upper
+bound. A side that empties completely is read as a gap in the data rather
+than flow, and a product missing from a tick is not matched at all: its
+last book is carried forward to the next tick that quotes it. An order is
+cancelled after ``ttl`` ticks. Quantities are clipped at submission so that
+the position plus every resting order on that side stays within the
+product's ``max_position``, and fills are clipped again against the live
+position.
+"""
+import argparse
+import heapq
+import itertools
+
+from backtest import DEFAULT_LIMIT, Metrics, State, flatten_orders, open_ticks, position_limits, run_backtest
+
+
+class RestingOrder:
+    __slots__ = ('product', 'price', 'remaining', 'queue_ahead', 'expires', 'sign')
+
+    def __init__(self, product, price, remaining, queue_ahead, expires, sign):
+        self.product = product
+        self.price = price
+        self.remaining = remaining
+        self.queue_ahead = queue_ahead
+        self.expires = expires
+        self.sign = sign
+
+
+def _side(book, sign):
+    """Displayed ``{price: volume}`` of the side a ``sign`` order rests on, price negated for sells.
+
+    With sells negated both sides read alike: a higher key is a better price.
+    """
+    if book is None:
+        return {}
+    levels = book.buy_orders if sign > 0 else book.sell_orders
+    return {price * sign: abs(volume) for price, volume in levels.items()}
+
+
+class MatchingEngine:
+    """Resting orders of one trader, matched tick by tick.
+
+    ``step(order_depth)`` matches what is resting against a new tick and
+    returns the fills; ``submit(orders, order_depth)`` then queues that
+    tick's orders behind the volume displayed at their prices.
+    """
+    def __init__(self, limits, ttl=1):
+        self.limits = limits
+        self.ttl = ttl
+        self.positions = {}
+        self.tick = 0
+        self.book = None
+        # (product, sign) -> heap of (-key, seq, RestingOrder); key is price * sign
+        self.resting = {}
+        self.open = {}
+        self._seq = itertools.count()
+
+    def submit(self, orders, order_depth):
+        """Queue ``(symbol, price, quantity)`` orders sent after seeing ``order_depth``."""
+        sides = {}
+        for product, price, qty in orders:
+            if qty == 0:
+                continue
+            sign = 1 if qty > 0 else -1
+            side = (product, sign)
+            limit = self.limits.get(product, DEFAULT_LIMIT)
+            open_qty = self.open.get(side, 0)
+            size = min(abs(qty), limit - sign * self.positions.get(product, 0) - open_qty)
+            if size <= 0:
+                continue
+            if side not in sides:
+                sides[side] = _side(order_depth.get(product), sign)
+            key = price * sign
+            order = RestingOrder(product, price, size, sides[side].get(key, 0), self.tick + self.ttl, sign)
+            heapq.heappush(self.resting.setdefault(side, []), (-key, next(self._seq), order))
+            self.open[side] = open_qty + size
+
+    def step(self, order_depth):
+        """Match resting orders against the tick ``order_depth``; returns ``[(product, price, qty)]``."""
+        self.tick += 1
+        previous = self.book or {}
+        fills = []
+        for (product, sign), heap in self.resting.items():
+            if not heap:
+                continue
+            after = order_depth.get(product)
+            if after is None:
+                self._expire(product, sign, heap)
+            else:
+                fills.extend(self._match_side(product, sign, heap, previous.get(product), after))
+        if previous.keys() <= order_depth.keys():
+            self.book = order_depth
+        else:
+            self.book = {**previous, **order_depth}
+        return fills
+
+    def _expire(self, product, sign, heap):
+        """Cancel the orders in ``heap`` whose ``ttl`` has run out, without matching them."""
+        survivors = [entry for entry in heap if entry[2].expires > self.tick]
+        if len(survivors) < len(heap):
+            for entry in heap:
+                if entry[2].expires <= self.tick:
+                    self.open[(product, sign)] -= entry[2].remaining
+            heap[:] = survivors
+            heapq.heapify(heap)
+
+    def _match_side(self, product, sign, heap, before, after):
+        queued_before = _side(before, sign)
+        queued_after = _side(after, sign)
+        # Opposite side in the same key space: a buy at key k crosses asks at key <= k.
+        opposite = sorted((price * sign, abs(volume)) for price, volume in
+                          (after.sell_orders if sign > 0 else after.buy_orders).items())
+        # Volume that left our side between the two ticks, and where it was queued.
+        # A side that emptied completely is a gap in the data, not flow.
+        flow = sum(max(0, volume - queued_after.get(key, 0)) for key, volume in queued_before.items()) \
+            if queued_after else 0
+        levels = sorted(queued_before.items(), reverse=True)
+        best_opposite = opposite[0][0] if opposite else None
+        better_key = better = None
+
+        limit = self.limits.get(product, DEFAULT_LIMIT)
+        taken = {}
+        filled_ahead = 0
+        survivors = []
+        fills = []
+        while heap:
+            entry = heapq.heappop(heap)
+            order = entry[2]
+            key = order.price * sign
+            room = limit - sign * self.positions.get(product, 0)
+
+            if best_opposite is not None and best_opposite <= key:
+                for level, volume in opposite:
+                    if level > key or order.remaining <= 0 or room <= 0:
+                        break
+                    size = min(order.remaining, room, volume - taken.get(level, 0))
+                    if size > 0:
+                        taken[level] = taken.get(level, 0) + size
+                        order.remaining -= size
+                        room -= size
+                        fills.append(self._fill(order, level * sign, size))
+
+            if key != better_key:
+                better_key = key
+                better = sum(volume for level, volume in levels if level > key)
+            reaching = max(0, flow - better)
+            available = reaching - order.queue_ahead - filled_ahead
+            size = min(order.remaining, room, available)
+            if size > 0:
+                order.remaining -= size
+                filled_ahead += size
+                fills.append(self._fill(order, order.price, size))
+            if queued_after:
+                order.queue_ahead = min(max(0, order.queue_ahead - reaching), queued_after.get(key, 0))
+
+            if order.remaining > 0 and order.expires > self.tick:
+                survivors.append(entry)
+            else:
+                self.open[(product, sign)] -= order.remaining
+        heap.extend(survivors)
+        heapq.heapify(heap)
+        return fills
+
+    def _fill(self, order, price, size):
+        qty = size * order.sign
+        self.positions[order.product] = self.positions.get(order.product, 0) + qty
+        self.open[(order.product, order.sign)] -= size
+        return order.product, price, qty
+
+
+def matching_stage(trader, ticks, engine):
+    """``(timestamp, order_depth, orders, fills)`` events; ``fills`` are those of the previous tick's orders."""
+    for timestamp, order_depth in ticks:
+        fills = engine.step(order_depth)
+        orders = flatten_orders(trader.run(State(timestamp, order_depth, dict(engine.positions))))
+        engine.submit(orders, order_depth)
+        yield timestamp, order_depth, orders, fills
+
+
+def run_matching_backtest(trader, ticks, ttl=1):
+    """``backtest.run_backtest`` with fills from a ``MatchingEngine``."""
+    metrics = Metrics()
+    engine = MatchingEngine(position_limits(trader), ttl)
+    for event in matching_stage(trader, ticks, engine):
+        metrics.update(*event)
+    return metrics.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('prices', help='price CSV or tick store directory')
+    parser.add_argument('--ttl', type=int, default=1, help='ticks an order rests before it is cancelled')
+    parser.add_argument('--compare', action='store_true', help='also run the same-tick fill model')
+    args = parser.parse_args()
+
+    from Strategy import Trader
+    ticks = open_ticks(args.prices, stream=not args.compare)
+
+    result = run_matching_backtest(Trader(compact=True), ticks, args.ttl)
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+    if args.compare:
+        same_tick = run_backtest(Trader(compact=True), ticks)
+        print(f"{'same-tick pnl':>15}: {same_tick['pnl']}  fills: {same_tick['fills']}")
+
+
+if __name__ == '__main__':
+    main()
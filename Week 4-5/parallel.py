@@ -0,0 +1,238 @@
+"""Evaluate the Week 4-5 strategies in worker processes, one group of products each.
+
+    python parallel.py prices.csv --processes 4 --batch 256
+    python parallel.py store/ --check       # also replay sequentially and compare
+
+``Trader.product_groups`` splits the products so that no strategy reads
+across groups; a pair or an index travels with all of its legs. Groups are
+spread over the workers, and every worker builds its own ``Trader`` and
+keeps the state of its products' strategies for the whole session. Only
+the books of a worker's products are sent to it.
+
+``ParallelTrader.run`` is a drop-in for ``Trader.run``. It merges the
+workers' orders back into the order the sequential trader emits them.
+``parallel_events`` goes further for backtests: fills only depend on a
+group's own orders and books, so each worker also matches its orders and
+tracks its positions, and ticks travel in batches of ``batch``. It yields
+the same ``(timestamp, order_depth, orders, fills, strategies)`` events as
+``backtest.fill_stage``.
+"""
+import argparse
+import os
+from itertools import islice
+
+from backtest import Metrics, State, fork_context, match_orders, open_ticks, position_limits, run_backtest
+from Strategy import OrderBuffer, Trader
+
+
+def _worker(conn, params):
+    trader = Trader(params, compact=True)
+    limits = position_limits(trader)
+    positions = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        kind, ticks = message
+        out = []
+        for tick in ticks:
+            if kind == 'run':
+                timestamp, depth, tick_positions = tick
+            else:
+                (timestamp, depth), tick_positions = tick, dict(positions)
+            result, _ = trader.run(State(timestamp, depth, tick_positions))
+            if not isinstance(result, dict):
+                result = dict.fromkeys(depth, result)
+            if kind == 'run':
+                out.append({product: list(orders.tagged()) for product, orders in result.items()})
+                continue
+            taken = {}
+            merged = {}
+            for product, orders in result.items():
+                strategies = list(orders.strategies)
+                orders = list(orders)
+                sources = []
+                fills = match_orders(orders, depth, positions, limits, taken, sources)
+                merged[product] = (orders, fills, strategies, [strategies[i] for i in sources])
+            out.append(merged)
+        conn.send(out)
+    conn.close()
+
+
+class ParallelTrader:
+    """``Trader`` whose product groups run in separate processes.
+
+    Call ``close`` (or use it as a context manager) to stop the workers.
+    Profiling is not available in this mode.
+    """
+    MAX_LIMIT = 0
+
+    def __init__(self, params=None, processes=None, compact=False):
+        self.compact = compact
+        trader = Trader(params)
+        self.strategies = trader.strategies
+        self.strategy_names = trader.strategy_names
+        groups = sorted(trader.product_groups(), key=len, reverse=True)
+        processes = max(1, min(processes or os.cpu_count() or 1, len(groups)))
+
+        # Largest groups first, each to the least loaded worker.
+        loads = [0] * processes
+        self.worker_of = {}
+        for group in groups:
+            worker = loads.index(min(loads))
+            loads[worker] += len(group)
+            self.worker_of.update(dict.fromkeys(group, worker))
+
+        context = fork_context()
+        self.connections = []
+        self.workers = []
+        for _ in range(processes):
+            parent, child = context.Pipe()
+            worker = context.Process(target=_worker, args=(child, params), daemon=True)
+            worker.start()
+            child.close()
+            self.connections.append(parent)
+            self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(None)
+            conn.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
+
+    def _split(self, order_depth):
+        """One ``{product: book}`` per worker; products no strategy knows stay here."""
+        parts = [{} for _ in self.connections]
+        for product, book in order_depth.items():
+            worker = self.worker_of.get(product)
+            if worker is not None:
+                parts[worker][product] = book
+        return parts
+
+    def _scatter(self, kind, batches):
+        """Send each worker its batch and collect one result list per worker."""
+        busy = [i for i, batch in enumerate(batches) if batch]
+        for i in busy:
+            self.connections[i].send((kind, batches[i]))
+        replies = [None] * len(batches)
+        for i in busy:
+            replies[i] = self.connections[i].recv()
+        return replies
+
+    def run_many(self, states):
+        """``run`` for several states at once, with one round trip per worker."""
+        batches = [[] for _ in self.connections]
+        for state in states:
+            positions = getattr(state, 'positions', {})
+            for worker, depth in enumerate(self._split(getattr(state, 'order_depth', {}))):
+                if depth:
+                    batches[worker].append((state.timestamp, depth, positions))
+        replies = [iter(reply or ()) for reply in self._scatter('run', batches)]
+
+        results = []
+        for state in states:
+            parts = self._split(getattr(state, 'order_depth', {}))
+            found = {}
+            for worker, depth in enumerate(parts):
+                if depth:
+                    found.update(next(replies[worker]))
+            result = {}
+            for product in state.order_depth:
+                buffer = OrderBuffer()
+                for order in found.get(product, ()):
+                    buffer.add(*order)
+                result[product] = buffer if self.compact else buffer.to_orders()
+            results.append((result, self.MAX_LIMIT))
+        return results
+
+    def run(self, state):
+        return self.run_many([state])[0]
+
+    def events(self, ticks, batch=256):
+        """Strategy and fill stages for ``ticks``, run and matched in the workers.
+
+        Each worker keeps its products' positions, so the events equal those of
+        ``fill_stage(strategy_stage(Trader(params), ticks, ...))``.
+        """
+        ticks = iter(ticks)
+        while True:
+            chunk = list(islice(ticks, batch))
+            if not chunk:
+                return
+            batches = [[] for _ in self.connections]
+            splits = []
+            for timestamp, order_depth in chunk:
+                parts = self._split(order_depth)
+                splits.append(parts)
+                for worker, depth in enumerate(parts):
+                    if depth:
+                        batches[worker].append((timestamp, depth))
+            replies = [iter(reply or ()) for reply in self._scatter('replay', batches)]
+
+            for (timestamp, order_depth), parts in zip(chunk, splits):
+                found = {}
+                for worker, depth in enumerate(parts):
+                    if depth:
+                        found.update(next(replies[worker]))
+                orders, fills, order_strategies, fill_strategies = [], [], [], []
+                for product in order_depth:
+                    product_orders, product_fills, strategies, filled_by = found.get(product, ((), (), (), ()))
+                    orders.extend(product_orders)
+                    fills.extend(product_fills)
+                    order_strategies.extend(strategies)
+                    fill_strategies.extend(filled_by)
+                yield timestamp, order_depth, orders, fills, (order_strategies, fill_strategies)
+
+
+def parallel_events(ticks, params=None, processes=None, batch=256):
+    """Backtest events for ``ticks`` from a temporary ``ParallelTrader``."""
+    with ParallelTrader(params, processes) as trader:
+        yield from trader.events(ticks, batch)
+
+
+def run_parallel_backtest(ticks, params=None, processes=None, batch=256):
+    """``backtest.run_backtest`` for ``Trader(params)``, with the groups in worker processes."""
+    metrics = Metrics()
+    for event in parallel_events(ticks, params, processes, batch):
+        metrics.update(*event)
+    return metrics.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('prices', help='price CSV or tick store directory')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--batch', type=int, default=256, help='ticks per round trip to the workers')
+    parser.add_argument('--check', action='store_true', help='compare against a sequential replay')
+    args = parser.parse_args()
+
+    ticks = open_ticks(args.prices)
+
+    with ParallelTrader(processes=args.processes) as trader:
+        groups = {}
+        for product, worker in trader.worker_of.items():
+            groups.setdefault(worker, []).append(product)
+        for worker, products in sorted(groups.items()):
+            print(f"{'worker ' + str(worker):>15}: {' '.join(products)}")
+        metrics = Metrics()
+        for event in trader.events(ticks, args.batch):
+            metrics.update(*event)
+    result = metrics.summary()
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+
+    if args.check:
+        sequential = run_backtest(Trader(compact=True), ticks)
+        print(f"{'sequential':>15}: {'identical' if sequential == result else 'DIFFERS'}")
+
+
+if __name__ == '__main__':
+    main()
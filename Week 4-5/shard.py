@@ -0,0 +1,212 @@
+"""Backtest the Week 4-5 Trader in time shards on a process pool.
+
+    python shard.py prices.csv --shards 8 --processes 8
+    python shard.py store/ --shards 8 --check      # also run single-process and compare
+
+The session is cut into ``shards`` consecutive ranges of ticks. Every
+shard after the first is run speculatively on the pool: a fresh ``Trader``
+backtests the ``warmup`` ticks before the shard from flat to fill its
+windows, then the shard itself. The worker keeps checkpoints every
+``stride`` ticks: for each of ``Trader.product_groups``, the state of the
+strategies trading it and the positions in it.
+
+Every window's sums are exact, so a trader's state only depends on the
+ticks still in its windows; a warm-up longer than the longest window
+(ABRA's 80 ticks) gives a shard the same strategy state the single-process run has at its start.
+Positions carry the whole history instead. They only match once the
+real run and the speculative one have both been driven to the same place,
+such as a position limit or flat.
+
+This process runs the session exactly, tick by tick, while the pool
+speculates. No strategy reads across product groups, so each group is
+checked on its own: at a shard's start, and at every checkpoint after it,
+a group whose speculative state equals the exact one is joined. Its orders
+and fills for the rest of the shard are taken from the speculative run,
+this process stops running it, and it carries on from the speculative end
+state at the next shard. The metrics are therefore always equal to
+``backtest.run_backtest``. How fast that is depends on how soon the
+positions of the slow groups meet; a group that never meets is run here
+no slower than in one process. With one process or one shard there is
+nothing to overlap, and the session is simply run here.
+
+``--no-verify`` stitches every speculative shard as it is, which is fully
+parallel but approximate wherever a warm-up did not reach the real positions.
+"""
+import argparse
+import os
+import time
+
+from backtest import Metrics, State, flatten_orders, fork_context, match_orders, open_ticks, position_limits, \
+    run_backtest
+from Strategy import Trader
+
+# More than twice the longest window in Trader's defaults (ABRA's 80 ticks).
+WARMUP = 200
+
+_ticks = None
+_params = None
+
+
+def _init_worker(ticks, params):
+    global _ticks, _params
+    _ticks = ticks
+    _params = params
+
+
+def plan_shards(n_ticks, shards, warmup=WARMUP):
+    """``[(warm_start, start, end)]`` for ``shards`` near-equal ranges of ``n_ticks``."""
+    bounds = [n_ticks * k // shards for k in range(shards + 1)]
+    return [(max(0, start - warmup), start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _snapshot(trader, positions, products):
+    """Strategy state and nonzero positions of ``products``, one of ``trader.product_groups()``."""
+    return trader.get_state(products), {product: positions[product] for product in products if positions.get(product)}
+
+
+def _snapshots(trader, positions, groups):
+    return [_snapshot(trader, positions, products) for products in groups]
+
+
+def _only(batch, products):
+    return [entry for entry in batch if entry[0] in products]
+
+
+def _merge(order_depth, exact, joined):
+    """``exact`` and ``joined`` orders (or fills) of disjoint products, in the order one run emits them."""
+    if not exact:
+        return joined
+    rank = {product: k for k, product in enumerate(order_depth)}
+    return sorted(exact + joined, key=lambda entry: rank[entry[0]])
+
+
+def _step(trader, limits, positions, tick):
+    timestamp, order_depth = tick
+    orders = flatten_orders(trader.run(State(timestamp, order_depth, dict(positions))))
+    return orders, match_orders(orders, order_depth, positions, limits)
+
+
+def _speculate(job):
+    """Warm up from flat, then run ``start:end``; returns events, checkpoints and the end state."""
+    warm_start, start, end, stride = job
+    trader = Trader(_params, compact=True)
+    groups = trader.product_groups()
+    limits = position_limits(trader)
+    positions = {}
+    for i in range(warm_start, start):
+        _step(trader, limits, positions, _ticks[i])
+
+    events = []
+    checkpoints = {}
+    for i in range(start, end):
+        if (i - start) % stride == 0:
+            checkpoints[i] = _snapshots(trader, positions, groups)
+        events.append(_step(trader, limits, positions, _ticks[i]))
+    return events, checkpoints, _snapshots(trader, positions, groups)
+
+
+def _pool(ticks, params, processes):
+    return fork_context().Pool(processes, initializer=_init_worker, initargs=(ticks, params))
+
+
+def run_sharded(ticks, shards, processes=None, params=None, warmup=WARMUP, stride=50, verify=True):
+    """Metrics summary for ``ticks`` backtested in ``shards`` time ranges, plus stitching stats.
+
+    ``accepted`` counts the product groups, over the shards after the
+    first, whose speculative run was joined at the shard's start or a later
+    checkpoint; ``replayed_ticks`` the ticks on which this process ran at
+    least one group.
+    """
+    plan = plan_shards(len(ticks), shards, warmup)
+    processes = min(processes or os.cpu_count() or 1, len(plan))
+    stats = {'shards': len(plan), 'accepted': 0, 'replayed_ticks': 0}
+    metrics = Metrics()
+
+    if not verify:
+        jobs = [(warm_start, start, end, stride) for warm_start, start, end in plan]
+        with _pool(ticks, params, processes) as pool:
+            for (_, start, _), (shard_events, _, _) in zip(plan, pool.imap(_speculate, jobs)):
+                for i, (orders, fills) in enumerate(shard_events, start):
+                    metrics.update(ticks[i][0], ticks[i][1], orders, fills)
+        return metrics.summary(), stats
+
+    if processes < 2:
+        stats['replayed_ticks'] = len(ticks)
+        return run_backtest(Trader(params, compact=True), ticks), stats
+
+    # This process runs the first shard itself, and every tick no speculative
+    # run can be joined at, so the pool gets one process fewer.
+    with _pool(ticks, params, processes - 1) as pool:
+        pending = {start: pool.apply_async(_speculate, ((warm_start, start, end, stride),))
+                   for warm_start, start, end in plan[1:]}
+        trader = Trader(params, compact=True)
+        groups = trader.product_groups()
+        limits = position_limits(trader)
+        positions = {}
+        for _, start, end in plan:
+            speculative = pending.get(start)
+            joined = []
+            joined_products = set()
+            for i in range(start, end):
+                if (speculative is not None and len(joined) < len(groups) and (i - start) % stride == 0
+                        and speculative.ready()):
+                    shard_events, checkpoints, end_states = speculative.get()
+                    for g, products in enumerate(groups):
+                        if g not in joined and checkpoints[i][g] == _snapshot(trader, positions, products):
+                            joined.append(g)
+                            joined_products.update(products)
+                timestamp, order_depth = ticks[i]
+                if not joined:
+                    orders, fills = _step(trader, limits, positions, ticks[i])
+                    stats['replayed_ticks'] += 1
+                else:
+                    rest = {product: book for product, book in order_depth.items() if product not in joined_products}
+                    orders, fills = [], []
+                    if rest:
+                        orders, fills = _step(trader, limits, positions, (timestamp, rest))
+                        stats['replayed_ticks'] += 1
+                    spec_orders, spec_fills = shard_events[i - start]
+                    orders = _merge(order_depth, orders, _only(spec_orders, joined_products))
+                    fills = _merge(order_depth, fills, _only(spec_fills, joined_products))
+                metrics.update(timestamp, order_depth, orders, fills)
+            # Joined groups carry on from where the speculative run ended.
+            for g in joined:
+                state, group_positions = end_states[g]
+                trader.set_state(state)
+                for product in groups[g]:
+                    positions.pop(product, None)
+                positions.update(group_positions)
+            stats['accepted'] += len(joined)
+    return metrics.summary(), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('prices', help='price CSV or tick store directory')
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=WARMUP, help='ticks backtested before each shard')
+    parser.add_argument('--stride', type=int, default=50, help='ticks between speculative checkpoints')
+    parser.add_argument('--no-verify', action='store_true', help='stitch speculative shards without checking')
+    parser.add_argument('--check', action='store_true', help='compare against a single-process run')
+    args = parser.parse_args()
+
+    ticks = open_ticks(args.prices)
+
+    start = time.perf_counter()
+    result, stats = run_sharded(ticks, args.shards, args.processes, warmup=args.warmup, stride=args.stride,
+                                verify=not args.no_verify)
+    elapsed = time.perf_counter() - start
+    for key, value in {**result, **stats}.items():
+        print(f"{key:>15}: {value}")
+    print(f"{'elapsed':>15}: {elapsed:.2f}s")
+
+    if args.check:
+        start = time.perf_counter()
+        single = run_backtest(Trader(compact=True), ticks)
+        print(f"{'single':>15}: {'identical' if single == result else 'DIFFERS'} "
+              f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
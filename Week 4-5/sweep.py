@@ -0,0 +1,116 @@
+"""Parallel hyperparameter sweeps for the Week 4-5 strategies.
+
+    python sweep.py prices.csv --samples 64 --processes 8
+    python sweep.py prices.csv --grid --products ABRA DROWZEE
+    python sweep.py store/ --samples 64
+
+The price data is loaded once in the parent and handed to each worker when
+the pool starts (inherited copy-on-write where ``fork`` is available), and
+every worker replays it with its own ``Trader(params)``. A tick store
+directory is memory-mapped instead, so workers share its pages.
+"""
+import argparse
+import itertools
+import random
+
+from backtest import fork_context, open_ticks, run_backtest
+from Strategy import Trader
+
+SEARCH_SPACE = {
+    "SUDOWOODO": {"min_spread": [1, 2, 3], "max_order_size": [10, 15, 20]},
+    "DROWZEE": {"window": [30, 50, 80], "short_window": [5, 10], "entry_std": [0.6, 0.8, 1.0]},
+    "ABRA": {"window": [60, 80, 100], "base_threshold": [1.0, 1.2, 1.5], "trend_weight": [0.0, 0.3, 0.6]},
+    "SHINX": {"entry_threshold": [1.25, 1.5, 2.0], "exit_threshold": [0.2, 0.3, 0.5]},
+    "LUXRAY/JOLTEON": {"entry_threshold": [1.25, 1.5, 2.0], "exit_threshold": [0.2, 0.3, 0.5]},
+    "ASH": {"vol_multiplier": [1.5, 2.0, 3.0]},
+    "MISTY": {"vol_multiplier": [1.5, 2.0, 3.0]},
+}
+
+
+def _axes(space):
+    return [(product, name, values) for product, params in space.items() for name, values in params.items()]
+
+
+def _nest(axes, values):
+    params = {}
+    for (product, name, _), value in zip(axes, values):
+        params.setdefault(product, {})[name] = value
+    return params
+
+
+def grid(space):
+    """Every combination of the values in ``space``."""
+    axes = _axes(space)
+    for values in itertools.product(*(axis[2] for axis in axes)):
+        yield _nest(axes, values)
+
+
+def random_search(space, samples, seed=0):
+    """``samples`` distinct random combinations from ``space``."""
+    axes = _axes(space)
+    rng = random.Random(seed)
+    total = 1
+    for axis in axes:
+        total *= len(axis[2])
+    seen = set()
+    while len(seen) < min(samples, total):
+        values = tuple(rng.choice(axis[2]) for axis in axes)
+        if values not in seen:
+            seen.add(values)
+            yield _nest(axes, values)
+
+
+_ticks = None
+
+
+def _init_worker(ticks):
+    global _ticks
+    _ticks = ticks
+
+
+def _evaluate(params):
+    result = run_backtest(Trader(params, compact=True), _ticks)
+    return {
+        'params': params,
+        'pnl': result['pnl'],
+        'max_drawdown': result['max_drawdown'],
+        'fills': result['fills'],
+    }
+
+
+def run_sweep(ticks, param_sets, processes=None):
+    """Backtest every parameter set on a process pool, best PnL first."""
+    with fork_context().Pool(processes, initializer=_init_worker, initargs=(ticks,)) as pool:
+        rows = list(pool.imap_unordered(_evaluate, list(param_sets)))
+    rows.sort(key=lambda row: (-row['pnl'], row['max_drawdown']))
+    return rows
+
+
+def format_table(rows, limit=20):
+    lines = [f"{'rank':>4}  {'pnl':>12}  {'drawdown':>12}  {'fills':>6}  params"]
+    for rank, row in enumerate(rows[:limit], 1):
+        params = ' '.join(f"{product}.{name}={value}"
+                          for product, values in row['params'].items() for name, value in values.items())
+        lines.append(f"{rank:>4}  {row['pnl']:>12.1f}  {row['max_drawdown']:>12.1f}  {row['fills']:>6}  {params}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('prices', help='price CSV or tick store directory to replay')
+    parser.add_argument('--grid', action='store_true', help='full grid instead of random search')
+    parser.add_argument('--samples', type=int, default=32, help='random search size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--products', nargs='*', help='only tune these products')
+    parser.add_argument('--top', type=int, default=20, help='rows to print')
+    args = parser.parse_args()
+
+    space = {p: SEARCH_SPACE[p] for p in (args.products or SEARCH_SPACE)}
+    param_sets = grid(space) if args.grid else random_search(space, args.samples, args.seed)
+    rows = run_sweep(open_ticks(args.prices), param_sets, args.processes)
+    print(format_table(rows, args.top))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Columnar on-disk tick store for replaying price dumps.
+
+    python tickstore.py convert store/ prices_day_-1.csv prices_day_0.csv
+    python tickstore.py info store/
+
+A store is a directory of ``.npy`` columns with one row per product and
+timestamp, in time order:
+
+    timestamp     int64        session timestamp (later days offset by DAY_LENGTH)
+    product       int16        index into products.json
+    bid_price     int64 [n,3]  bid_volume int32 [n,3]
+    ask_price     int64 [n,3]  ask_volume int32 [n,3]   (volume 0 = no level)
+    tick_start    int64 [T+1]  first row of each timestamp
+
+Prices are stored multiplied by ``price_scale`` (in meta.json), the power
+of ten that makes every price in the CSVs whole: 1 for the usual integer
+books, 10 when some price has one decimal, and so on.
+
+``TickStore`` memory-maps the columns and builds each tick's order depth on
+demand, so iterating it yields the same ``(timestamp, {product: Book})``
+pairs as ``backtest.load_prices`` without reading the session into RAM.
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from backtest import Book, DAY_LENGTH, State
+
+LEVELS = 3
+COLUMNS = ('bid_price', 'bid_volume', 'ask_price', 'ask_volume')
+
+
+def _rows(paths):
+    for path in paths:
+        with open(path, newline='') as f:
+            yield from csv.DictReader(f, delimiter=';')
+
+
+def _int(text, what, scale=1):
+    value = float(text) * scale
+    whole = round(value)
+    if abs(value - whole) > 1e-6 * max(1, abs(value)):
+        raise ValueError(f"{what} {text!r} is not a multiple of {1 / scale:g}")
+    return whole
+
+
+def _decimals(text):
+    """Digits after the decimal point that ``text`` needs."""
+    text = text.strip().lower()
+    if 'e' in text:
+        mantissa, exponent = text.split('e')
+        return max(0, _decimals(mantissa) - int(exponent))
+    return len(text.partition('.')[2].rstrip('0'))
+
+
+def convert(out_dir, csv_paths):
+    """Write the price CSVs in ``csv_paths`` (in time order) as a store in ``out_dir``.
+
+    The CSVs are read twice, once to size the columns and find the price
+    scale and once to fill them, so memory use does not grow with the length
+    of the session.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    n = 0
+    products = {}
+    first_day = None
+    decimals = 0
+    for row in _rows(csv_paths):
+        n += 1
+        products.setdefault(row['product'], len(products))
+        day = int(row.get('day') or 0)
+        first_day = day if first_day is None else min(first_day, day)
+        for side in ('bid', 'ask'):
+            for level in range(LEVELS):
+                price = row.get(f'{side}_price_{level + 1}')
+                if price:
+                    decimals = max(decimals, _decimals(price))
+    scale = 10 ** decimals
+
+    def column(name, dtype, shape=()):
+        path = os.path.join(out_dir, name + '.npy')
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n,) + shape)
+
+    timestamps = column('timestamp', np.int64)
+    product_ids = column('product', np.int16)
+    levels = {name: column(name, np.int64 if name.endswith('price') else np.int32, (LEVELS,)) for name in COLUMNS}
+    tick_start = [0]
+
+    last = None
+    for i, row in enumerate(_rows(csv_paths)):
+        timestamp = (int(row.get('day') or 0) - first_day) * DAY_LENGTH + int(row['timestamp'])
+        if last is not None and timestamp < last:
+            raise ValueError(f"row {i + 2}: timestamp {row['timestamp']} is out of order")
+        if last is not None and timestamp != last:
+            tick_start.append(i)
+        last = timestamp
+        timestamps[i] = timestamp
+        product_ids[i] = products[row['product']]
+        for side in ('bid', 'ask'):
+            for level in range(LEVELS):
+                price = row.get(f'{side}_price_{level + 1}')
+                volume = row.get(f'{side}_volume_{level + 1}')
+                if price and volume:
+                    levels[f'{side}_price'][i, level] = _int(price, 'price', scale)
+                    levels[f'{side}_volume'][i, level] = abs(_int(volume, 'volume'))
+    tick_start.append(n)
+
+    for array in (timestamps, product_ids, *levels.values()):
+        array.flush()
+    np.save(os.path.join(out_dir, 'tick_start.npy'), np.array(tick_start if n else [0], dtype=np.int64))
+    with open(os.path.join(out_dir, 'products.json'), 'w') as f:
+        json.dump(list(products), f)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump({'price_scale': scale}, f)
+
+
+class TickStore:
+    """Read-only, memory-mapped view of a converted store."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'products.json')) as f:
+            self.products = json.load(f)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.price_scale = json.load(f)['price_scale']
+        else:
+            # Stores written before prices were scaled hold whole prices.
+            self.price_scale = 1
+        load = lambda name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+        self.timestamp = load('timestamp')
+        self.product = load('product')
+        self.tick_start = load('tick_start')
+        for name in COLUMNS:
+            setattr(self, name, load(name))
+
+    def __reduce__(self):
+        # Worker processes reopen the memory maps instead of copying them.
+        return TickStore, (self.path,)
+
+    def __len__(self):
+        return len(self.tick_start) - 1
+
+    def order_depth(self, tick):
+        """``(timestamp, {product: Book})`` for tick number ``tick``."""
+        start, end = int(self.tick_start[tick]), int(self.tick_start[tick + 1])
+        products = self.product[start:end].tolist()
+        bid_price = self.bid_price[start:end]
+        ask_price = self.ask_price[start:end]
+        if self.price_scale != 1:
+            bid_price = bid_price / self.price_scale
+            ask_price = ask_price / self.price_scale
+        bid_price = bid_price.tolist()
+        ask_price = ask_price.tolist()
+        bid_volume = self.bid_volume[start:end].tolist()
+        ask_volume = self.ask_volume[start:end].tolist()
+        depth = {}
+        for row, product in enumerate(products):
+            buy_orders = {p: v for p, v in zip(bid_price[row], bid_volume[row]) if v}
+            sell_orders = {p: -v for p, v in zip(ask_price[row], ask_volume[row]) if v}
+            depth[self.products[product]] = Book(buy_orders, sell_orders)
+        return int(self.timestamp[start]), depth
+
+    def state(self, tick, positions=None):
+        timestamp, depth = self.order_depth(tick)
+        return State(timestamp, depth, dict(positions or {}))
+
+    def __getitem__(self, tick):
+        if isinstance(tick, slice):
+            return [self.order_depth(i) for i in range(*tick.indices(len(self)))]
+        if tick < 0:
+            tick += len(self)
+        if not 0 <= tick < len(self):
+            raise IndexError(tick)
+        return self.order_depth(tick)
+
+    def __iter__(self):
+        for tick in range(len(self)):
+            yield self.order_depth(tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert_cmd = commands.add_parser('convert', help='convert price CSVs into a store')
+    convert_cmd.add_argument('out_dir')
+    convert_cmd.add_argument('csv', nargs='+')
+    info_cmd = commands.add_parser('info', help='summarize a store')
+    info_cmd.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args.out_dir, args.csv)
+    store = TickStore(args.out_dir if args.command == 'convert' else args.store)
+    size = sum(os.path.getsize(os.path.join(store.path, f)) for f in os.listdir(store.path))
+    print(f"{len(store)} ticks, {len(store.product)} rows, {len(store.products)} products, {size / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
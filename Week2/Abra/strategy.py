@@ -1,4 +1,5 @@
 from src.backtester import Order, OrderBook
+from src.bookview import BookView
 from typing import List
 
 class Trader:
@@ -11,18 +12,17 @@ class Trader:
     def run(self, state, current_position):
         result = {}  # Stores orders by product
         orders: List[Order] = []
-        order_depth: OrderBook = state.order_depth
+        order_depth = BookView(state.order_depth)
 
-        if not order_depth.buy_orders or not order_depth.sell_orders:
+        if order_depth.mid is None:
             result["PRODUCT"] = orders
             return result
 
-        # Sort bids and asks to find best
-        best_ask, ask_vol = min(order_depth.sell_orders.items(), key=lambda x: x[0])  # lowest sell
-        best_bid, bid_vol = max(order_depth.buy_orders.items(), key=lambda x: x[0])  # highest buy
+        best_ask, ask_vol = order_depth.best_ask, order_depth.ask_volume  # lowest sell
+        best_bid, bid_vol = order_depth.best_bid, order_depth.bid_volume  # highest buy
 
-        spread = best_ask - best_bid
-        mid = (best_ask + best_bid) / 2
+        spread = order_depth.spread
+        mid = order_depth.mid
 
         # If we think it's profitable, we buy at or below a small discount from the midpoint
         buy_price = int(mid - spread * 0.25)  # buy lower than midpoint by 25% of spread
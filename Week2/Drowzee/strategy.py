@@ -1,4 +1,5 @@
 from src.backtester import Order, OrderBook
+from src.bookview import BookView
 from typing import List
 
 class Trader:
@@ -11,18 +12,18 @@ class Trader:
     def run(self, state, current_position):
         result = {}  # Stores your orders
         orders: List[Order] = []
-        order_depth: OrderBook = state.order_depth
+        order_depth = BookView(state.order_depth, key=int)
 
-        if not order_depth.buy_orders or not order_depth.sell_orders:
+        if order_depth.spread is None:
             return {"PRODUCT": orders}
 
         # Best bid and ask
-        best_bid, bid_vol = max(order_depth.buy_orders.items(), key=lambda x: int(x[0]))
+        best_bid, bid_vol = order_depth.best_bid, order_depth.bid_volume
 
-        best_ask, ask_vol = min(order_depth.sell_orders.items(), key=lambda x: int(x[0]))
+        best_ask, ask_vol = order_depth.best_ask, order_depth.ask_volume
 
         # If the spread is reasonable (say <= 4), we consider adding liquidity
-        if int(best_ask) - int(best_bid) <= 4:
+        if order_depth.spread <= 4:
             # If we have room to buy
             if current_position < 50:
                 orders.append(Order("PRODUCT", int(best_bid), 10))  # buy 10 at best bid
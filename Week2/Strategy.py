@@ -1,8 +1,7 @@
 
 from src.backtester import Order, OrderBook
+from src.bookview import BookView
 from typing import List
-import pandas as pd
-import numpy as np
 import statistics
 
 class BaseClass:
@@ -36,11 +35,11 @@ class DrowzeeStrategy(BaseClass):
         if not orderbook.buy_orders or not orderbook.sell_orders:
             return orders
 
-        best_bid = max(orderbook.buy_orders.keys())
-        best_bid_volume = orderbook.buy_orders[best_bid]
-        best_ask = min(orderbook.sell_orders.keys())
-        best_ask_volume = orderbook.sell_orders[best_ask]
-        spread = best_ask - best_bid
+        best_bid = orderbook.best_bid
+        best_bid_volume = orderbook.bid_volume
+        best_ask = orderbook.best_ask
+        best_ask_volume = orderbook.ask_volume
+        spread = orderbook.spread
 
         if spread <= 4:
             if position < self.max_position:
@@ -62,9 +61,9 @@ class AbraStrategy(BaseClass):
         if not orderbook.buy_orders or not orderbook.sell_orders:
             return orders
 
-        best_ask = min(orderbook.sell_orders.keys())
-        best_bid = max(orderbook.buy_orders.keys())
-        mid_price = (best_ask + best_bid) / 2
+        best_ask = orderbook.best_ask
+        best_bid = orderbook.best_bid
+        mid_price = orderbook.mid
 
         self.mid_prices.append(mid_price)
         if len(self.mid_prices) > self.reversion_window:
@@ -79,11 +78,11 @@ class AbraStrategy(BaseClass):
         lower_threshold = mean_price - 1.5 * std_dev
 
         if best_ask < lower_threshold and position < self.max_position:
-            buy_amount = min(-orderbook.sell_orders[best_ask], self.max_position - position)
+            buy_amount = min(-orderbook.ask_volume, self.max_position - position)
             orders.append(Order(self.product_name, best_ask, buy_amount))
 
         if best_bid > upper_threshold and position > -self.max_position:
-            sell_amount = min(orderbook.buy_orders[best_bid], position + self.max_position)
+            sell_amount = min(orderbook.bid_volume, position + self.max_position)
             orders.append(Order(self.product_name, best_bid, -sell_amount))
 
         return orders
@@ -103,7 +102,7 @@ class Trader:
         for product, orderbook in state.order_depth.items():
             if product in self.strategies:
                 current_position = positions.get(product, 0)
-                product_orders = self.strategies[product].get_orders(state, orderbook, current_position)
+                product_orders = self.strategies[product].get_orders(state, BookView(orderbook), current_position)
                 result[product] = product_orders
 
         return result
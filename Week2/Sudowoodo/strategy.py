@@ -2,6 +2,7 @@
 from typing import List, Dict
 from statistics import mean, stdev
 from src.backtester import Order, OrderBook
+from src.bookview import BookView
 
 class Trader:
     def __init__(self):
@@ -11,14 +12,11 @@ class Trader:
     def run(self, state, current_position: int) -> Dict[str, List[Order]]:
         result = {}
         orders: List[Order] = []
-        order_depth: OrderBook = state.order_depth
+        order_depth = BookView(state.order_depth)
 
         # Compute mid-price and update history
-        if len(order_depth.sell_orders) > 0 and len(order_depth.buy_orders) > 0:
-            best_ask = min(order_depth.sell_orders.keys())
-            best_bid = max(order_depth.buy_orders.keys())
-            mid_price = (best_ask + best_bid) / 2
-            self.mid_prices.append(mid_price)
+        if order_depth.mid is not None:
+            self.mid_prices.append(order_depth.mid)
             if len(self.mid_prices) > self.window_size:
                 self.mid_prices.pop(0)
 
@@ -35,15 +33,15 @@ class Trader:
         lower_threshold = mean_price - 1.5 * std_dev
 
         # Buy logic
-        if len(order_depth.sell_orders) > 0:
-            best_ask, best_ask_amount = sorted(order_depth.sell_orders.items())[0]
+        if order_depth.best_ask is not None:
+            best_ask, best_ask_amount = order_depth.best_ask, order_depth.ask_volume
             if best_ask < lower_threshold and current_position < 50:
                 buy_amount = min(-best_ask_amount, 50 - current_position)
                 orders.append(Order("PRODUCT", best_ask, buy_amount))
 
         # Sell logic
-        if len(order_depth.buy_orders) > 0:
-            best_bid, best_bid_amount = sorted(order_depth.buy_orders.items(), reverse=True)[0]
+        if order_depth.best_bid is not None:
+            best_bid, best_bid_amount = order_depth.best_bid, order_depth.bid_volume
             if best_bid > upper_threshold and current_position > -50:
                 sell_amount = min(best_bid_amount, current_position + 50)
                 orders.append(Order("PRODUCT", best_bid, -sell_amount))
@@ -0,0 +1,306 @@
+"""Vectorized batch backtests for the Week2 traders.
+
+The traders in this folder see one ``state`` per call. For parameter
+research the same signals can be computed for a whole day at once from
+columns of best bid/ask prices and volumes:
+
+    book = BookColumns(bid_price, bid_volume, ask_price, ask_volume)
+    result = batch_backtest(rolling_band_signals(book), book)
+
+Missing sides are NaN prices with zero volume, and ask volumes are negative
+as in ``OrderBook.sell_orders``. Orders fill against the best level of the
+same tick: a buy crosses when its price is at or above the best ask and
+takes at most the displayed ask volume, a sell likewise against the bid.
+Fills are clipped so the position never leaves +/-``limit``.
+
+``replay`` runs a real ``Trader`` tick by tick under the same fill rules and
+returns the same result, so the two paths can be compared directly.
+"""
+from collections import namedtuple
+import time
+
+import numpy as np
+
+LIMIT = 50
+
+# How the tick-path trader sizes an order against its start-of-tick position:
+# FREE orders ignore it, GATED orders are only sent while the position is
+# inside the limit on that side, CAPPED orders are also sized to the room left.
+FREE, GATED, CAPPED = 0, 1, 2
+
+BookColumns = namedtuple('BookColumns', ['bid_price', 'bid_volume', 'ask_price', 'ask_volume'])
+
+
+def _no_order(book):
+    return np.full(len(book.bid_price), np.nan), np.zeros(len(book.bid_price)), FREE
+
+
+def fixed_quote_signals(book, fair_value=10000, edge=2, size=10):
+    """``SudowoodoStrategy`` in Week2/Strategy.py: quote around a fixed fair value."""
+    active = ~(np.isnan(book.bid_price) & np.isnan(book.ask_price))
+    sell_price = np.where(active, fair_value + edge, np.nan)
+    buy_price = np.where(active, fair_value - edge, np.nan)
+    qty = np.where(active, size, 0)
+    return [(sell_price, -qty, FREE), (buy_price, qty, FREE)]
+
+
+def spread_filter_signals(book, max_spread=4, size=10):
+    """Week2 Drowzee: join both sides while the spread is at most ``max_spread``."""
+    active = (book.ask_price - book.bid_price) <= max_spread
+    buy_price = np.where(active, book.bid_price, np.nan)
+    sell_price = np.where(active, book.ask_price, np.nan)
+    qty = np.where(active, size, 0)
+    return [(buy_price, qty, GATED), (sell_price, -qty, GATED)]
+
+
+def mid_discount_signals(book, fraction=0.25):
+    """Week2 Abra: take the touch when it is beyond mid -/+ ``fraction`` of the spread."""
+    spread = book.ask_price - book.bid_price
+    mid = (book.ask_price + book.bid_price) / 2
+    buy_threshold = np.trunc(mid - spread * fraction)
+    sell_threshold = np.trunc(mid + spread * fraction)
+    buy = book.ask_price <= buy_threshold
+    sell = book.bid_price >= sell_threshold
+    return [
+        (np.where(buy, book.ask_price, np.nan), np.where(buy, book.ask_volume, 0), FREE),
+        (np.where(sell, book.bid_price, np.nan), np.where(sell, -book.bid_volume, 0), FREE),
+    ]
+
+
+def _rolling_mean_std(mids, window):
+    """Rolling mean and sample stdev of every full ``window`` of ``mids``.
+
+    Half-tick mids are doubled into integers first so the window sums are
+    exact, matching ``statistics.mean``/``stdev`` on the same values.
+    """
+    doubled = mids * 2
+    if np.array_equal(doubled, np.round(doubled)):
+        values, scale = doubled.astype(np.int64), 2
+    else:
+        values, scale = mids, 1
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    total = windows.sum(axis=1)
+    total_sq = (windows * windows).sum(axis=1)
+    mean = total / (scale * window)
+    variance = (window * total_sq - total * total) / (scale * scale * window * (window - 1))
+    return mean, np.sqrt(np.maximum(variance, 0))
+
+
+def rolling_band_signals(book, window=20, width=1.5, one_sided=True):
+    """Week2 Sudowoodo (and ``AbraStrategy`` in Week2/Strategy.py): fade the touch
+    outside mean +/- ``width`` stdevs of the last ``window`` mids.
+
+    With ``one_sided`` a tick missing one side still trades the other side
+    against the bands of the last full window, as the Sudowoodo trader does;
+    otherwise such ticks are skipped, as ``AbraStrategy`` does.
+    """
+    valid = ~np.isnan(book.bid_price) & ~np.isnan(book.ask_price)
+    mids = ((book.bid_price + book.ask_price) / 2)[valid]
+    if len(mids) < window:
+        return [_no_order(book), _no_order(book)]
+
+    mean, std = _rolling_mean_std(mids, window)
+    seen = np.cumsum(valid)
+    ready = seen >= window
+    if not one_sided:
+        ready &= valid
+    row = np.clip(seen - window, 0, None)
+    upper = np.where(ready, mean[row] + width * std[row], np.nan)
+    lower = np.where(ready, mean[row] - width * std[row], np.nan)
+
+    buy = book.ask_price < lower
+    sell = book.bid_price > upper
+    return [
+        (np.where(buy, book.ask_price, np.nan), np.where(buy, -book.ask_volume, 0), CAPPED),
+        (np.where(sell, book.bid_price, np.nan), np.where(sell, -book.bid_volume, 0), CAPPED),
+    ]
+
+
+def _first_binding_tick(steps, rules, limit):
+    """First tick where the position limit changes an unconstrained fill, or None."""
+    after = np.cumsum(steps.ravel()).reshape(steps.shape)
+    start = after[:, -1] - steps.sum(axis=1)
+    start = start[:, None]
+    buy, sell = steps > 0, steps < 0
+    gated = rules >= GATED
+    capped = rules == CAPPED
+    binding = (np.abs(after) > limit)
+    binding |= gated & ((buy & (start >= limit)) | (sell & (start <= -limit)))
+    binding |= capped & ((buy & (steps > limit - start)) | (sell & (-steps > limit + start)))
+    rows = np.flatnonzero(binding.any(axis=1))
+    return int(rows[0]) if len(rows) else None
+
+
+def _apply_limit(steps, rules, limit, first):
+    """Re-run the position-dependent sizing sequentially from tick ``first``."""
+    steps = steps.copy()
+    position = steps[:first].sum()
+    rules = rules.tolist()
+    active = np.flatnonzero(steps[first:].any(axis=1)) + first
+    for t in active.tolist():
+        row = steps[t].tolist()
+        start = position
+        for i, qty in enumerate(row):
+            if qty == 0:
+                continue
+            if rules[i] >= GATED and ((qty > 0 and start >= limit) or (qty < 0 and start <= -limit)):
+                qty = 0
+            elif rules[i] == CAPPED:
+                qty = min(qty, limit - start) if qty > 0 else max(qty, -limit - start)
+            target = min(max(position + qty, -limit), limit)
+            row[i] = target - position
+            position = target
+        steps[t] = row
+    return steps
+
+
+def batch_backtest(orders, book, limit=LIMIT):
+    """Fill per-tick order columns against ``book`` and mark the result to mid.
+
+    ``orders`` is a list of (price, qty, rule) columns in the order the trader
+    would submit them within a tick; a zero qty means no order. Fills are
+    computed for every tick at once, and only ticks from the first one where
+    the position limit binds are walked sequentially.
+    """
+    n = len(book.bid_price)
+    fills, prices = [np.zeros(n)], [np.zeros(n)]
+    for price, qty, _ in orders:
+        buy = (qty > 0) & (price >= book.ask_price)
+        sell = (qty < 0) & (price <= book.bid_price)
+        filled = np.where(buy, np.minimum(qty, np.maximum(-book.ask_volume, 0)), 0)
+        filled = np.where(sell, -np.minimum(-qty, np.maximum(book.bid_volume, 0)), filled)
+        fills.append(filled)
+        prices.append(np.where(buy, book.ask_price, np.where(sell, book.bid_price, 0.0)))
+
+    steps = np.stack(fills[1:] or fills, axis=1)
+    prices = np.stack(prices[1:] or prices, axis=1)
+    rules = np.array([rule for _, _, rule in orders] or [FREE])
+    first = _first_binding_tick(steps, rules, limit)
+    if first is not None:
+        steps = _apply_limit(steps, rules, limit, first)
+    return _summarize(steps, prices, book)
+
+
+def _summarize(steps, prices, book):
+    traded = steps.sum(axis=1)
+    position = np.cumsum(traded)
+    cash = -np.cumsum((steps * prices).sum(axis=1))
+
+    mid = (book.bid_price + book.ask_price) / 2
+    marked = np.where(np.isnan(mid), 0, np.arange(len(mid)))
+    np.maximum.accumulate(marked, out=marked)
+    mark = np.nan_to_num(mid[marked])
+    return {
+        'position': position.astype(np.int64),
+        'cash': cash,
+        'pnl': cash + position * mark,
+        'volume': int(np.abs(steps).sum()),
+    }
+
+
+class _Book:
+    def __init__(self, buy_orders, sell_orders):
+        self.buy_orders = buy_orders
+        self.sell_orders = sell_orders
+
+
+class _State:
+    def __init__(self, timestamp, order_depth, positions):
+        self.timestamp = timestamp
+        self.order_depth = order_depth
+        self.positions = positions
+
+
+def _level(price, volume):
+    if np.isnan(price):
+        return {}
+    price = int(price) if price == int(price) else float(price)
+    return {price: int(volume)}
+
+
+def replay(trader, book, limit=LIMIT, product=None):
+    """Run ``trader`` tick by tick over ``book`` under the batch fill rules.
+
+    Single-product traders are called as ``run(state, position)``; pass
+    ``product`` to drive a multi-product ``Trader`` with ``run(state)``.
+    """
+    n = len(book.bid_price)
+    steps = np.zeros((n, 2))
+    prices = np.zeros((n, 2))
+    position = 0
+    for t in range(n):
+        bid_p, bid_v = book.bid_price[t], book.bid_volume[t]
+        ask_p, ask_v = book.ask_price[t], book.ask_volume[t]
+        orderbook = _Book(_level(bid_p, bid_v), _level(ask_p, ask_v))
+        if product is None:
+            result = trader.run(_State(t, orderbook, {}), position)
+            orders = result.get('PRODUCT', [])
+        else:
+            result = trader.run(_State(t, {product: orderbook}, {product: position}))
+            orders = result.get(product, [])
+
+        if len(orders) > steps.shape[1]:
+            steps = np.pad(steps, ((0, 0), (0, len(orders) - steps.shape[1])))
+            prices = np.pad(prices, ((0, 0), (0, len(orders) - prices.shape[1])))
+        for i, order in enumerate(orders):
+            qty = order.quantity
+            if qty > 0 and order.price >= ask_p:
+                filled, fill_price = min(qty, max(-ask_v, 0)), ask_p
+            elif qty < 0 and order.price <= bid_p:
+                filled, fill_price = -min(-qty, max(bid_v, 0)), bid_p
+            else:
+                continue
+            target = min(max(position + filled, -limit), limit)
+            steps[t, i] = target - position
+            prices[t, i] = fill_price
+            position = target
+    return _summarize(steps, prices, book)
+
+
+def random_walk_book(n=10000, start=10000, seed=0):
+    """Seeded single-product book with occasional one-sided and crossed ticks."""
+    rng = np.random.default_rng(seed)
+    mid = start + np.cumsum(rng.choice([-1, 0, 0, 1], size=n))
+    spread = rng.choice([-1, 0, 1, 2, 3, 4, 5, 6], size=n)
+    bid_price = mid.astype(float)
+    ask_price = (mid + spread).astype(float)
+    bid_volume = rng.integers(1, 30, size=n).astype(float)
+    ask_volume = -rng.integers(1, 30, size=n).astype(float)
+    bid_missing = rng.random(n) < 0.02
+    ask_missing = rng.random(n) < 0.02
+    bid_price[bid_missing], bid_volume[bid_missing] = np.nan, 0
+    ask_price[ask_missing], ask_volume[ask_missing] = np.nan, 0
+    return BookColumns(bid_price, bid_volume, ask_price, ask_volume)
+
+
+if __name__ == '__main__':
+    import importlib.util
+    import os
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def load_trader(path):
+        spec = importlib.util.spec_from_file_location('week2_trader', os.path.join(here, path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.Trader()
+
+    book = random_walk_book()
+    cases = [
+        ('Drowzee/strategy.py', None, spread_filter_signals),
+        ('Abra/strategy.py', None, mid_discount_signals),
+        ('Sudowoodo/strategy.py', None, rolling_band_signals),
+        ('Strategy.py', 'SUDOWOODO', fixed_quote_signals),
+        ('Strategy.py', 'DROWZEE', spread_filter_signals),
+        ('Strategy.py', 'ABRA', lambda b: rolling_band_signals(b, one_sided=False)),
+    ]
+    for path, product, signals in cases:
+        start = time.perf_counter()
+        expected = replay(load_trader(path), book, product=product)
+        tick_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = batch_backtest(signals(book), book)
+        batch_time = time.perf_counter() - start
+        match = all(np.array_equal(result[k], expected[k]) for k in ('position', 'cash', 'pnl'))
+        print(f"{path:22} {product or '':10} pnl {result['pnl'][-1]:10.1f}  "
+              f"tick {tick_time * 1000:8.1f} ms  batch {batch_time * 1000:6.2f} ms  match={match}")
@@ -0,0 +1,205 @@
+"""Benchmark every generation of Trader on seeded synthetic order books.
+
+    python benchmark.py                                  # print a table
+    python benchmark.py --save benchmarks/baseline.json  # record a baseline
+    python benchmark.py --compare benchmarks/baseline.json
+
+Each trader is replayed over the same pre-built states for three market
+regimes: a random walk, a mean-reverting (Ornstein-Uhlenbeck) price and a
+set of products cointegrated with one common factor. Throughput and
+per-tick latency come from a plain timed pass; peak memory from a second
+pass under tracemalloc, so tracing does not skew the timings. ``--compare``
+exits non-zero when throughput drops or peak memory grows by more than
+``--tolerance`` against the saved baseline.
+
+Traders are loaded through ``registry`` and driven through its
+``UnifiedTrader``, so both ``run`` signatures are timed the same way. They
+import ``src.backtester``; the stand-in in ``src/`` is used unless the real
+backtester comes first on the path.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from registry import registry
+from src.backtester import OrderBook
+
+WEEK2_PRODUCTS = {"SUDOWOODO": 10000, "DROWZEE": 5000, "ABRA": 3000}
+WEEK45_PRODUCTS = {
+    "SUDOWOODO": 10000, "DROWZEE": 5000, "ABRA": 3000, "SHINX": 2000,
+    "LUXRAY": 1500, "JOLTEON": 3000, "ASH": 1800, "MISTY": 2000,
+}
+
+# registry name -> products and start prices it is benchmarked on
+TRADERS = {
+    "week2/abra": {"PRODUCT": 10000},
+    "week2/drowzee": {"PRODUCT": 10000},
+    "week2/sudowoodo": {"PRODUCT": 10000},
+    "week2": WEEK2_PRODUCTS,
+    "week4-5": WEEK45_PRODUCTS,
+}
+
+
+class State:
+    def __init__(self, timestamp, order_depth, positions):
+        self.timestamp = timestamp
+        self.order_depth = order_depth
+        self.positions = positions
+
+
+def random_walk(products, n, rng):
+    mids = dict(products)
+    for _ in range(n):
+        for product in mids:
+            mids[product] += rng.choice((-1, 0, 0, 1))
+        yield dict(mids)
+
+
+def mean_reverting(products, n, rng, speed=0.05, sigma=1.5):
+    deviation = dict.fromkeys(products, 0.0)
+    for _ in range(n):
+        for product in deviation:
+            deviation[product] += -speed * deviation[product] + rng.gauss(0, sigma)
+        yield {product: products[product] + deviation[product] for product in products}
+
+
+def cointegrated(products, n, rng, speed=0.1, sigma=1.0):
+    """Every product tracks one random-walk factor, scaled to its start price,
+    plus its own mean-reverting spread."""
+    base = next(iter(products.values()))
+    factor = 0.0
+    spread = dict.fromkeys(products, 0.0)
+    for _ in range(n):
+        factor += rng.gauss(0, 1)
+        for product in spread:
+            spread[product] += -speed * spread[product] + rng.gauss(0, sigma)
+        yield {product: start * (1 + factor / base) + spread[product] for product, start in products.items()}
+
+
+REGIMES = {"random_walk": random_walk, "mean_reverting": mean_reverting, "cointegrated": cointegrated}
+
+
+def _book(mid, rng):
+    spread = rng.choice((1, 2, 2, 3, 4))
+    best_bid = int(round(mid - spread / 2))
+    best_ask = best_bid + spread
+    buy_orders = {best_bid - i: rng.randint(1, 30) for i in range(rng.randint(1, 3))}
+    sell_orders = {best_ask + i: -rng.randint(1, 30) for i in range(rng.randint(1, 3))}
+    return OrderBook(buy_orders, sell_orders)
+
+
+def make_states(regime, products, n, seed):
+    rng = random.Random(seed)
+    states = []
+    for t, mids in enumerate(REGIMES[regime](products, n, rng)):
+        depth = {product: _book(mid, rng) for product, mid in mids.items()}
+        states.append(State(t * 100, depth, {}))
+    return states
+
+
+def _replay(trader, states):
+    for state in states:
+        trader.run(state)
+
+
+def _timed_replay(trader, states):
+    latencies = []
+    clock = time.perf_counter_ns
+    for state in states:
+        start = clock()
+        trader.run(state)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def measure(name, states):
+    latencies = _timed_replay(registry.create(name), states)
+    latencies.sort()
+    total = sum(latencies)
+
+    tracemalloc.start()
+    _replay(registry.create(name), states)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] / 1e3
+    return {
+        "ticks": len(latencies),
+        "ticks_per_sec": len(latencies) / (total / 1e9) if total else 0.0,
+        "mean_us": total / len(latencies) / 1e3,
+        "p50_us": pick(0.50),
+        "p99_us": pick(0.99),
+        "peak_kb": peak / 1024,
+    }
+
+
+def run(names, regimes, n, seed):
+    results = {}
+    for name in names:
+        registry.load_class(name)  # import outside the timed passes
+        for regime in regimes:
+            states = make_states(regime, TRADERS[name], n, seed)
+            results[f"{name}:{regime}"] = measure(name, states)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every case that regressed beyond ``tolerance``."""
+    problems = []
+    for case, now in results.items():
+        before = baseline.get(case)
+        if before is None:
+            continue
+        if now["ticks_per_sec"] < before["ticks_per_sec"] * (1 - tolerance):
+            problems.append(f"{case}: throughput {before['ticks_per_sec']:.0f} -> {now['ticks_per_sec']:.0f} ticks/s")
+        if now["peak_kb"] > before["peak_kb"] * (1 + tolerance):
+            problems.append(f"{case}: peak memory {before['peak_kb']:.0f} -> {now['peak_kb']:.0f} KB")
+    return problems
+
+
+def format_table(results):
+    lines = [f"{'case':32} {'ticks/s':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'peak KB':>9}"]
+    for case, r in results.items():
+        lines.append(f"{case:32} {r['ticks_per_sec']:>10.0f} {r['mean_us']:>9.1f} {r['p50_us']:>9.1f} "
+                     f"{r['p99_us']:>9.1f} {r['peak_kb']:>9.0f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--traders", nargs="*", choices=list(TRADERS), default=list(TRADERS))
+    parser.add_argument("--regimes", nargs="*", choices=list(REGIMES), default=list(REGIMES))
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="check results against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = run(args.traders, args.regimes, args.ticks, args.seed)
+    print(format_table(results))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"ticks": args.ticks, "seed": args.seed, "python": platform.python_version(),
+                       "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if (baseline["ticks"], baseline["seed"]) != (args.ticks, args.seed):
+            print(f"warning: baseline used --ticks {baseline['ticks']} --seed {baseline['seed']}")
+        problems = compare(results, baseline["results"], args.tolerance)
+        for line in problems:
+            print("REGRESSION", line)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Find the traders in this repo and import each one only when it is first used.
+
+    from registry import registry
+    registry.names()                  # ['week2', 'week2/abra', ..., 'week4-5']
+    trader = registry.create('week2/abra')
+    trader.run(state)                 # {product: orders}, whatever the generation
+
+A trader is any ``strategy.py`` (any case) that defines ``class Trader``; its
+name is its directory relative to the repo, lower-cased without spaces.
+Discovery reads the files but imports nothing, so starting a worker that
+only needs one trader does not pay for the others' imports.
+"""
+import importlib.util
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProductState:
+    """What a single-product trader expects: one book as ``order_depth``."""
+    def __init__(self, timestamp, order_depth, positions):
+        self.timestamp = timestamp
+        self.order_depth = order_depth
+        self.positions = positions
+
+
+class UnifiedTrader:
+    """``run(state) -> {product: orders}`` over both trader interfaces.
+
+    Multi-product traders are called as ``run(state)``; a ``(result, limit)``
+    return is unwrapped, and a bare order list (what Week 4-5 returns for a
+    ``PRODUCT``-only book) is filed under ``product``. Single-product traders (``run(state,
+    current_position)``) are given ``product``'s book and position, and get
+    nothing to do on ticks without that product.
+    """
+    def __init__(self, trader, product="PRODUCT"):
+        self.trader = trader
+        self.product = product
+        # run(self, state, current_position); read off the code object, as
+        # importing inspect would cost more than loading a trader.
+        self.single = trader.run.__code__.co_argcount == 3
+
+    def run(self, state):
+        if self.single:
+            book = state.order_depth.get(self.product)
+            if book is None:
+                return {}
+            positions = getattr(state, 'positions', {})
+            inner = ProductState(state.timestamp, book, positions)
+            return self.trader.run(inner, positions.get(self.product, 0))
+        result = self.trader.run(state)
+        if isinstance(result, tuple):
+            result = result[0]
+        return result if isinstance(result, dict) else {self.product: result}
+
+
+class Registry:
+    def __init__(self, root=ROOT):
+        self.root = root
+        self._paths = None
+        self._classes = {}
+
+    def _discover(self):
+        paths = {}
+        for directory, subdirs, files in os.walk(self.root):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith(('.', '__')))
+            for file in files:
+                if file.lower() != 'strategy.py':
+                    continue
+                path = os.path.join(directory, file)
+                with open(path, 'rb') as f:
+                    if b'\nclass Trader' not in f.read():
+                        continue
+                name = os.path.relpath(directory, self.root).replace(os.sep, '/').replace(' ', '').lower()
+                paths[name] = path
+        return paths
+
+    def names(self):
+        if self._paths is None:
+            self._paths = self._discover()
+        return sorted(self._paths)
+
+    def path(self, name):
+        self.names()
+        if name not in self._paths:
+            raise KeyError(f"no trader {name!r}; known: {', '.join(self.names())}")
+        return self._paths[name]
+
+    def load_class(self, name):
+        """The ``Trader`` class of ``name``, importing its module on first call."""
+        if name not in self._classes:
+            path = self.path(name)
+            module_name = "trader_" + name.replace("/", "_").replace("-", "_")
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._classes[name] = module.Trader
+        return self._classes[name]
+
+    def create(self, name, *args, product="PRODUCT", **kwargs):
+        """A new ``name`` trader behind the ``UnifiedTrader`` interface."""
+        return UnifiedTrader(self.load_class(name)(*args, **kwargs), product)
+
+
+registry = Registry()
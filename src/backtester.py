@@ -0,0 +1,31 @@
+"""Local stand-in for the course backtester's ``Order`` and ``OrderBook``.
+
+Only what the strategies in this repo touch is provided, so the traders can
+be imported and benchmarked without the real backtester checked out. When
+the real one is on the path ahead of this directory it is used instead.
+"""
+
+
+class Order:
+    __slots__ = ('symbol', 'price', 'quantity')
+
+    def __init__(self, symbol, price, quantity):
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+
+    def __repr__(self):
+        return f"Order({self.symbol!r}, {self.price!r}, {self.quantity!r})"
+
+    def __eq__(self, other):
+        return (isinstance(other, Order)
+                and (self.symbol, self.price, self.quantity) == (other.symbol, other.price, other.quantity))
+
+
+class OrderBook:
+    """Price -> volume on each side; sell volumes are negative."""
+    __slots__ = ('buy_orders', 'sell_orders')
+
+    def __init__(self, buy_orders=None, sell_orders=None):
+        self.buy_orders = buy_orders if buy_orders is not None else {}
+        self.sell_orders = sell_orders if sell_orders is not None else {}
@@ -0,0 +1,44 @@
+"""``BookView``, the top-of-book view every trader in this repo reads books through.
+
+This is the repo's own code, unlike ``backtester``, and is kept next to it
+so that the Week2 and Week 4-5 traders share one copy.
+"""
+import heapq
+
+
+class BookView:
+    """Read-only view of an OrderBook with its top of book precomputed.
+
+    Best bid/ask, their volumes, mid and spread are computed once when the
+    view is built; sorted depth is computed on first request and cached, so
+    every strategy reading the same book in a tick shares the work. ``key``
+    orders price keys that are not numbers (``key=int`` for string prices);
+    mid and spread are then computed on ``key(price)``.
+    """
+    def __init__(self, orderbook, product=None, key=None):
+        self.product = product
+        self.buy_orders = orderbook.buy_orders
+        self.sell_orders = orderbook.sell_orders
+        self.best_bid = max(self.buy_orders, key=key) if self.buy_orders else None
+        self.best_ask = min(self.sell_orders, key=key) if self.sell_orders else None
+        self.bid_volume = self.buy_orders[self.best_bid] if self.best_bid is not None else 0
+        self.ask_volume = self.sell_orders[self.best_ask] if self.best_ask is not None else 0
+        if self.best_bid is not None and self.best_ask is not None:
+            bid, ask = (key(self.best_bid), key(self.best_ask)) if key else (self.best_bid, self.best_ask)
+            self.mid = (bid + ask) / 2
+            self.spread = ask - bid
+        else:
+            self.mid = None
+            self.spread = None
+        self.key = key
+        self._depth = {}
+
+    def depth(self, n):
+        """Top ``n`` levels as (bids high-to-low, asks low-to-high) of (price, volume)."""
+        if n not in self._depth:
+            key = self.key
+            order = (lambda level: key(level[0])) if key else (lambda level: level[0])
+            bids = heapq.nlargest(n, self.buy_orders.items(), key=order)
+            asks = heapq.nsmallest(n, self.sell_orders.items(), key=order)
+            self._depth[n] = (bids, asks)
+        return self._depth[n]
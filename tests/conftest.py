@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The Week 4-5 tools import each other as siblings and the strategies import
+# src.backtester from the repo root.
+for path in (os.path.join(ROOT, 'Week 4-5'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
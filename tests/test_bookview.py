@@ -0,0 +1,16 @@
+from backtest import Book
+from src.bookview import BookView
+
+
+def test_depth_is_sorted_and_cached():
+    view = BookView(Book({99: 5, 101: 2, 100: 7}, {104: -1, 102: -3, 103: -4}))
+    bids, asks = view.depth(2)
+    assert bids == [(101, 2), (100, 7)]
+    assert asks == [(102, -3), (103, -4)]
+    assert view.depth(2) is view.depth(2)
+    assert view.depth(5) == ([(101, 2), (100, 7), (99, 5)], [(102, -3), (103, -4), (104, -1)])
+
+
+def test_depth_orders_string_prices_by_key():
+    view = BookView(Book({'99': 5, '100': 7}, {'102': -3, '1000': -1}), key=int)
+    assert view.depth(1) == ([('100', 7)], [('102', -3)])
@@ -0,0 +1,55 @@
+from backtest import Book, State, flatten_orders, order_strategies
+from Strategy import Trader
+
+# Components price ASH at 0.6 * 1500 + 0.3 * 3000 + 0.1 * 2000 = 2000; it is quoted
+# at 2010, so ASH is sold and the components bought.
+BOOKS = {
+    'LUXRAY': Book({1499: 10}, {1501: -10}),
+    'JOLTEON': Book({2999: 10}, {3001: -10}),
+    'SHINX': Book({1999: 10}, {2001: -10}),
+    'ASH': Book({2009: 10}, {2011: -10}),
+}
+
+
+def ash_orders(positions):
+    trader = Trader(compact=True, net=False)
+    result, _ = trader.run(State(0, BOOKS, positions))
+    return flatten_orders({'ASH': result['ASH']})
+
+
+def test_full_hedge_when_flat():
+    assert ash_orders({}) == [('ASH', 2011, -15), ('LUXRAY', 1501, 9), ('JOLTEON', 3001, 4), ('SHINX', 2001, 1)]
+
+
+def test_component_at_limit_skips_the_trade():
+    assert ash_orders({'SHINX': 60}) == []
+
+
+def test_clipped_leg_scales_the_index_down():
+    # LUXRAY has room for 3, which hedges at most 6 units (int(0.6 * 6) == 3).
+    assert ash_orders({'LUXRAY': 247}) == [('ASH', 2011, -6), ('LUXRAY', 1501, 3), ('JOLTEON', 3001, 1),
+                                           ('SHINX', 2001, 1)]
+
+
+def test_index_room_limits_the_trade():
+    assert ash_orders({'ASH': -55}) == [('ASH', 2011, -5), ('LUXRAY', 1501, 3), ('JOLTEON', 3001, 1),
+                                        ('SHINX', 2001, 1)]
+
+
+def test_missing_hedge_quote_skips_the_trade():
+    books = dict(BOOKS, JOLTEON=Book({2999: 10}, {}))
+    trader = Trader(compact=True, net=False)
+    result, _ = trader.run(State(0, books, {}))
+    assert list(result['ASH']) == []
+
+
+def test_netting_keeps_every_index_hedged():
+    # MISTY prices at 0.67 * 1500 + 0.33 * 3000 = 1995 and is sold too. ASH's
+    # hedge takes 9 of LUXRAY's 10 of room, so MISTY is sized to the 1 left.
+    books = dict(BOOKS, MISTY=Book({2009: 10}, {2011: -10}))
+    trader = Trader(compact=True)
+    result, _ = trader.run(State(0, books, {'LUXRAY': 240}))
+    misty = trader.strategy_names.index('IndexStrategy(MISTY)')
+    orders = [order for order, tag in zip(flatten_orders(result), order_strategies(result)) if tag == misty]
+    assert orders == [('LUXRAY', 1501, 1), ('JOLTEON', 3001, 1), ('MISTY', 2011, -2)]
+    assert sum(qty for product, _, qty in flatten_orders(result) if product == 'LUXRAY') == 10
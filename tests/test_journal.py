@@ -0,0 +1,31 @@
+import benchmark
+from backtest import Metrics, run_pipeline
+from journal import Journal, JournalWriter, diff
+from Strategy import Trader
+
+
+def _record(path, ticks):
+    trader = Trader(compact=True)
+    metrics = Metrics()
+    with JournalWriter(str(path), trader) as journal:
+        run_pipeline(trader, ticks, [metrics, journal])
+    return Journal(str(path)), metrics.summary()
+
+
+def test_orders_and_fills_carry_the_emitting_strategy(tmp_path):
+    states = benchmark.make_states('cointegrated', benchmark.WEEK45_PRODUCTS, 600, 1)
+    ticks = [(state.timestamp, state.order_depth) for state in states]
+    journal, summary = _record(tmp_path / 'a.jrnl', ticks)
+    assert len(journal) == summary['orders'] + summary['fills']
+
+    seen = {(event['product'], event['strategy'], event['kind'])
+            for event in map(journal.describe, range(len(journal)))}
+    # Both indices hedge in LUXRAY, and the pair trades it too; each is told apart.
+    strategies = {strategy for product, strategy, _ in seen if product == 'LUXRAY'}
+    assert {'IndexStrategy(ASH)', 'IndexStrategy(MISTY)', 'PairStrategy(LUXRAY/JOLTEON)'} <= strategies
+    assert all(strategy != '' for _, strategy, _ in seen)
+    assert {(product, strategy) for product, strategy, kind in seen if kind == 'fill'} <= \
+        {(product, strategy) for product, strategy, kind in seen if kind == 'order'}
+
+    again, _ = _record(tmp_path / 'b.jrnl', ticks)
+    assert diff(journal, again) is None
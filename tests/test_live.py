@@ -0,0 +1,12 @@
+from live import LiveStats
+
+
+def test_stats_keep_only_the_latest_window():
+    stats = LiveStats(window=100)
+    for i in range(10_000):
+        stats.latencies.append(i * 1e-6)
+        stats.run_times.append(i * 1e-6)
+    assert len(stats.latencies) == len(stats.run_times) == 100
+    summary = stats.summary()
+    assert round(summary['latency_p50_us']) == round(summary['run_p50_us']) == 9950
+    assert round(summary['latency_p99_us']) == 9999
@@ -0,0 +1,48 @@
+from backtest import Book
+from matching import MatchingEngine
+
+
+def _engine(orders, book, ttl=1):
+    engine = MatchingEngine({'X': 50}, ttl)
+    engine.step({'X': book})
+    engine.submit(orders, {'X': book})
+    return engine
+
+
+def test_trade_flow_fills_an_order_at_the_front():
+    # 6 left the 99 level; the buy at 100 had nothing queued ahead of it.
+    engine = _engine([('X', 100, 5)], Book({99: 10}, {102: -10}))
+    assert engine.step({'X': Book({99: 4}, {102: -10})}) == [('X', 100, 5)]
+    assert engine.positions == {'X': 5}
+
+
+def test_queue_ahead_fills_first():
+    engine = _engine([('X', 99, 5)], Book({99: 10}, {102: -10}))
+    assert engine.step({'X': Book({99: 7}, {102: -10})}) == []
+
+
+def test_crossing_order_takes_the_opposite_side():
+    engine = _engine([('X', 102, 5)], Book({99: 10}, {103: -10}))
+    assert engine.step({'X': Book({99: 10}, {101: -3, 102: -10})}) == [('X', 101, 3), ('X', 102, 2)]
+
+
+def test_missing_product_is_not_matched():
+    book = Book({99: 10}, {101: -10})
+    engine = _engine([('X', 99, 5)], book, ttl=2)
+    assert engine.step({}) == []
+    # The last book is carried forward, so the next tick is matched against it.
+    assert engine.book['X'] is book
+    assert engine.step({'X': Book({99: 10}, {101: -10})}) == []
+    assert engine.open[('X', 1)] == 0
+
+
+def test_missing_product_still_expires_orders():
+    engine = _engine([('X', 99, 5)], Book({99: 10}, {101: -10}))
+    engine.step({})
+    assert engine.resting[('X', 1)] == []
+    assert engine.open[('X', 1)] == 0
+
+
+def test_emptied_side_is_not_flow():
+    engine = _engine([('X', 100, 5)], Book({99: 10}, {102: -10}))
+    assert engine.step({'X': Book({}, {102: -10})}) == []
@@ -0,0 +1,62 @@
+from backtest import Book, State, flatten_orders, match_orders, order_strategies
+from Strategy import OrderBuffer, Trader, net_orders
+
+
+def test_fractional_prices_are_kept():
+    buffer = OrderBuffer()
+    buffer.add('ABRA', 2999.5, 3)
+    buffer.add('ABRA', 3001, -2)
+    assert list(buffer) == [('ABRA', 2999.5, 3), ('ABRA', 3001.0, -2)]
+    orders = buffer.to_orders()
+    assert [(o.price, o.quantity) for o in orders] == [(2999.5, 3), (3001, -2)]
+    assert type(orders[1].price) is int
+
+
+def test_trader_on_fractional_book():
+    book = Book({9999.5: 10}, {10004.5: -10})
+    trader = Trader(compact=True)
+    orders = flatten_orders(trader.run(State(0, {'SUDOWOODO': book}, {})))
+    assert ('SUDOWOODO', 10000.0, 15) in orders
+
+    fills = match_orders([('SUDOWOODO', 10004.5, 4)], {'SUDOWOODO': book}, {}, {})
+    assert fills == [('SUDOWOODO', 10004.5, 4)]
+
+
+def test_netting_keeps_each_strategys_orders():
+    a, b = OrderBuffer(owner=1), OrderBuffer(owner=2)
+    a.add('LUXRAY', 1500, 10)
+    b.add('LUXRAY', 1500, 5)
+    b.add('LUXRAY', 1499, -4)
+    netted = net_orders([a, b], {}, {'LUXRAY': 250}, {})
+    # The crossing 4 come out of strategy 1, which quoted 1500 first.
+    assert list(netted['LUXRAY'].tagged()) == [('LUXRAY', 1500, 6, 1), ('LUXRAY', 1500, 5, 2)]
+
+
+
+def test_netting_one_strategy():
+    orders = OrderBuffer(owner=3)
+    orders.add('ABRA', 99, 5)
+    orders.add('ABRA', 104, -5)
+    orders.add('ABRA', 101, 5)
+    # Passed through best first while it fits the limit.
+    netted = net_orders([orders], {}, {'ABRA': 50}, {})
+    assert list(netted['ABRA'].tagged()) == [('ABRA', 101, 5, 3), ('ABRA', 99, 5, 3), ('ABRA', 104, -5, 3)]
+    # Cut once it does not.
+    netted = net_orders([orders], {'ABRA': 43}, {'ABRA': 50}, netted)
+    assert list(netted['ABRA'].tagged()) == [('ABRA', 101, 5, 3), ('ABRA', 99, 2, 3), ('ABRA', 104, -5, 3)]
+
+
+def test_trader_tags_orders_with_their_strategy():
+    trader = Trader(compact=True)
+    books = {
+        'LUXRAY': Book({1499: 10}, {1501: -10}),
+        'JOLTEON': Book({2999: 10}, {3001: -10}),
+        'SHINX': Book({1999: 10}, {2001: -10}),
+        'ASH': Book({2009: 10}, {2011: -10}),
+    }
+    result = trader.run(State(0, books, {}))
+    named = {(symbol, trader.strategy_names[tag]) for symbol, _, _, tag in
+             (order for orders in result[0].values() for order in orders.tagged())}
+    assert ('ASH', 'IndexStrategy(ASH)') in named
+    assert ('LUXRAY', 'IndexStrategy(ASH)') in named
+    assert order_strategies(result) == [tag for orders in result[0].values() for tag in orders.strategies]
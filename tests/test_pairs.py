@@ -0,0 +1,86 @@
+import random
+
+from backtest import Book, State
+from Strategy import MarketSnapshot, PairsTradingStrategy, PairStrategy
+
+
+def _book(mid):
+    """Book whose mid is ``mid`` rounded to the half tick."""
+    bid = int(mid * 2) // 2
+    ask = bid + (1 if round(mid * 2) % 2 else 2)
+    return Book({bid: 10}, {ask: -10})
+
+
+def _correlation(a, b):
+    mean_a, mean_b = sum(a) / len(a), sum(b) / len(b)
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b))
+    return cov / (sum((x - mean_a) ** 2 for x in a) * sum((y - mean_b) ** 2 for y in b)) ** 0.5
+
+
+def test_zscore_tracks_the_residual_of_a_known_pair():
+    # y = 0.5 * x + N(0, 2) while x random-walks.
+    rng = random.Random(7)
+    strategy = PairsTradingStrategy('Y', 60, 'X')
+    x = 3000.0
+    residuals, scores = [], []
+    for t in range(1500):
+        x += rng.choice((-2, -1, 0, 1, 2))
+        residual = rng.gauss(0, 2)
+        market = MarketSnapshot({'Y': _book(0.5 * x + residual), 'X': _book(x)})
+        strategy.get_orders(None, market.books['Y'], 0, market)
+        if t >= 200:
+            y_mid, x_mid = market.mid['Y'], market.mid['X']
+            residuals.append(y_mid - 0.5 * x_mid)
+            scores.append(strategy.hedge.residual_zscore('Y', strategy.hedge_ratio, y_mid, x_mid))
+    assert abs(strategy.hedge_ratio - 0.5) < 0.25
+    assert _correlation(scores, residuals) > 0.9
+
+
+def _warm_pair(**params):
+    """PairStrategy fitted on A = 2 * B +/- 1 while B random-walks."""
+    rng = random.Random(3)
+    strategy = PairStrategy('A', 100, 'B', 350, **params)
+    b = 1000
+    for t in range(100):
+        b += rng.choice((-2, -1, 0, 1, 2))
+        _pair_orders(strategy, 2 * b + (1 if t % 2 else -1), b, {})
+    return strategy, b
+
+
+def _pair_orders(strategy, a, b, positions):
+    market = MarketSnapshot({'A': _book(a), 'B': _book(b)})
+    state = State(0, market.books, positions)
+    return {leg: list(strategy.get_orders(state, market.books[leg], positions.get(leg, 0), market))
+            for leg in ('A', 'B')}
+
+
+def test_pair_entry_keeps_the_hedge_ratio():
+    strategy, b = _warm_pair()
+    assert abs(strategy.hedge_ratio - 2) < 0.1
+    orders = _pair_orders(strategy, 2 * b + 20, b, {})
+    (a_order,), (b_order,) = orders['A'], orders['B']
+    assert a_order[2] == -12
+    assert b_order[2] == round(12 * strategy.hedge_ratio)
+
+
+def test_pair_entry_fits_the_hedge_leg_limit():
+    # B has room for 10, which hedges int(10 / ratio) units of A.
+    strategy, b = _warm_pair()
+    orders = _pair_orders(strategy, 2 * b + 20, b, {'B': 340})
+    (a_order,), (b_order,) = orders['A'], orders['B']
+    assert a_order[2] == -int(10 / strategy.hedge_ratio)
+    assert 0 < b_order[2] <= 10
+
+
+def test_pair_exit_unwinds_both_legs():
+    strategy, b = _warm_pair()
+    orders = _pair_orders(strategy, 2 * b, b, {'A': -30, 'B': 60})
+    (a_order,), (b_order,) = orders['A'], orders['B']
+    # Short A is bought back on its bid, long B sold on its ask.
+    assert a_order[1:] == (2 * b, 8)
+    assert b_order[1:] == (b + 2, -round(8 * strategy.hedge_ratio))
+
+
+def test_pair_exit_leaves_small_positions():
+    strategy, b = _warm_pair()
+    assert _pair_orders(strategy, 2 * b, b, {'A': -5, 'B': 60})['A'] == []
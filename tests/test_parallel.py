@@ -0,0 +1,27 @@
+import benchmark
+from backtest import fill_stage, flatten_orders, order_strategies, position_limits, strategy_stage
+from parallel import ParallelTrader
+from Strategy import Trader
+
+
+def _session(n, seed, regime='cointegrated'):
+    return benchmark.make_states(regime, benchmark.WEEK45_PRODUCTS, n, seed)
+
+
+def test_events_equal_the_sequential_stages():
+    ticks = [(state.timestamp, state.order_depth) for state in _session(600, 4)]
+    trader = Trader(compact=True)
+    positions = {}
+    sequential = list(fill_stage(strategy_stage(trader, ticks, positions), positions, position_limits(trader)))
+    with ParallelTrader(processes=2) as parallel:
+        # A batch that does not divide the session exercises the last short batch.
+        assert list(parallel.events(ticks, batch=64)) == sequential
+
+
+def test_run_equals_trader_run():
+    trader = Trader(compact=True)
+    with ParallelTrader(processes=2, compact=True) as parallel:
+        for state in _session(200, 5):
+            expected, got = trader.run(state), parallel.run(state)
+            assert flatten_orders(got) == flatten_orders(expected)
+            assert order_strategies(got) == order_strategies(expected)
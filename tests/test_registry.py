@@ -0,0 +1,26 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from conftest import ROOT
+
+
+def test_creating_a_trader_stays_cheap():
+    # Neither discovery nor the traders' module-level imports may pull in NumPy.
+    code = ("import sys; from registry import registry\n"
+            "for name in registry.names(): registry.create(name)\n"
+            "print(sorted(m for m in ('numpy', 'pandas', 'inspect') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+
+def test_product_only_book_comes_back_keyed_by_product():
+    from registry import registry
+    from src.backtester import OrderBook
+
+    book = OrderBook({99: 10}, {101: -10})
+    state = SimpleNamespace(timestamp=0, order_depth={'PRODUCT': book}, positions={})
+    for name in registry.names():
+        result = registry.create(name).run(state)
+        assert isinstance(result, dict), name
+        assert set(result) <= {'PRODUCT'}, name
@@ -0,0 +1,68 @@
+import random
+import statistics
+
+import pytest
+
+import benchmark
+from Strategy import RollingWindow
+
+
+def half_ticks(rng, n):
+    return [rng.randint(2000, 20000) / 2 for _ in range(n)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_statistics_on_half_tick_mids(seed):
+    rng = random.Random(seed)
+    maxlen = rng.randint(2, 80)
+    tail = rng.randint(2, maxlen)
+    window = RollingWindow(maxlen, tails=(tail,))
+    values = half_ticks(rng, 3 * maxlen)
+    for i, value in enumerate(values, 1):
+        window.append(value)
+        seen = values[max(0, i - maxlen):i]
+        assert window.mean() == statistics.mean(seen)
+        if len(seen) >= 2:
+            assert window.stdev() == statistics.stdev(seen)
+        recent = seen[-tail:]
+        assert window.tail_mean(tail) == statistics.mean(recent)
+        if len(recent) >= 2:
+            assert window.tail_stdev(tail) == statistics.stdev(recent)
+
+
+def test_matches_statistics_on_arbitrary_floats():
+    rng = random.Random(1)
+    window = RollingWindow(30)
+    values = [rng.gauss(0, 1) * 10 ** rng.randint(-4, 4) for _ in range(300)]
+    for i, value in enumerate(values, 1):
+        window.append(value)
+        seen = values[max(0, i - 30):i]
+        if len(seen) >= 2:
+            assert window.mean() == statistics.mean(seen)
+            assert window.stdev() == statistics.stdev(seen)
+
+
+def test_drowzee_window_on_random_walk_seed_1():
+    # Running float sums divided before the sqrt gave 1.7142857142857144 at
+    # tick 3476, which cut a DROWZEE sell from 14 to 13.
+    states = benchmark.make_states('random_walk', benchmark.WEEK45_PRODUCTS, 3477, 1)
+    mids = [(max(book.buy_orders) + min(book.sell_orders)) / 2
+            for book in (state.order_depth['DROWZEE'] for state in states)]
+    window = RollingWindow(50)
+    for mid in mids:
+        window.append(mid)
+    assert window.stdev() == statistics.stdev(mids[-50:]) == 1.7142857142857142
+
+
+def test_state_round_trip_keeps_statistics():
+    rng = random.Random(7)
+    window = RollingWindow(40, tails=(10,))
+    for value in half_ticks(rng, 100):
+        window.append(value)
+    restored = RollingWindow(40, tails=(10,))
+    restored.set_state(window.get_state())
+    for value in half_ticks(rng, 60):
+        window.append(value)
+        restored.append(value)
+        assert (restored.mean(), restored.stdev(), restored.tail_stdev(10)) == \
+            (window.mean(), window.stdev(), window.tail_stdev(10))
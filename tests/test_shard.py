@@ -0,0 +1,55 @@
+import benchmark
+import shard
+from backtest import position_limits, run_backtest
+from Strategy import Trader
+
+
+def _session(products, n, seed, regime='random_walk'):
+    return [(state.timestamp, state.order_depth) for state in benchmark.make_states(regime, products, n, seed)]
+
+
+def _handoffs(ticks, shards):
+    """Speculative and single-process snapshot of each product group at the start of every shard after the first."""
+    plan = shard.plan_shards(len(ticks), shards)
+    shard._init_worker(ticks, None)
+    speculative = {start: shard._speculate((warm_start, start, end, 50))[1][start]
+                   for warm_start, start, end in plan[1:]}
+    trader = Trader(compact=True)
+    groups = trader.product_groups()
+    limits = position_limits(trader)
+    positions = {}
+    single = {}
+    for i, tick in enumerate(ticks):
+        if i in speculative:
+            single[i] = shard._snapshots(trader, positions, groups)
+        shard._step(trader, limits, positions, tick)
+    return [pair for start in speculative for pair in zip(speculative[start], single[start])]
+
+
+def test_warmed_up_strategy_state_matches_the_single_run():
+    handoffs = _handoffs(_session(benchmark.WEEK45_PRODUCTS, 3000, 1), 6)
+    assert all(spec[0] == exact[0] for spec, exact in handoffs)
+
+
+def test_most_handoffs_are_accepted():
+    handoffs = _handoffs(_session({'SUDOWOODO': 10000, 'DROWZEE': 5000}, 3000, 2), 6)
+    assert sum(spec == exact for spec, exact in handoffs) > len(handoffs) // 2
+
+
+def test_converging_groups_join_on_their_own():
+    # The pairs and index group's positions never meet, but SUDOWOODO's and
+    # DROWZEE's do, and they are joined without it.
+    ticks = _session(benchmark.WEEK45_PRODUCTS, 3000, 2)
+    single = run_backtest(Trader(compact=True), ticks)
+    result, stats = shard.run_sharded(ticks, 6, processes=2, stride=25)
+    assert result == single
+    assert stats['accepted'] > 0
+
+
+def test_sharded_totals_equal_the_single_run():
+    ticks = _session(benchmark.WEEK45_PRODUCTS, 1500, 3, 'cointegrated')
+    single = run_backtest(Trader(compact=True), ticks)
+    for processes in (1, 2):
+        result, stats = shard.run_sharded(ticks, 3, processes=processes, stride=25)
+        assert result == single
+        assert stats['shards'] == 3
@@ -0,0 +1,37 @@
+from backtest import load_prices
+from tickstore import TickStore, convert
+
+HEADER = ('day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;bid_price_3;bid_volume_3;'
+          'ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;ask_price_3;ask_volume_3;mid_price;profit_and_loss')
+ROWS = [
+    '0;0;A;100;5;99;3;;;102;4;;;;;101;0',
+    '0;0;B;10.25;7;;;;;10.5;2;;;;;10.375;0',
+    '0;100;A;101;5;;;;;103;4;;;;;102;0',
+    '0;100;B;10.3;7;;;;;10.45;2;;;;;10.375;0',
+]
+
+
+def _plain(ticks):
+    return [(timestamp, {product: (book.buy_orders, book.sell_orders) for product, book in depth.items()})
+            for timestamp, depth in ticks]
+
+
+def _store(tmp_path, rows):
+    path = tmp_path / 'prices.csv'
+    path.write_text('\n'.join([HEADER, *rows]) + '\n')
+    convert(str(tmp_path / 'store'), [str(path)])
+    return str(path), TickStore(str(tmp_path / 'store'))
+
+
+def test_fractional_prices_round_trip(tmp_path):
+    path, store = _store(tmp_path, ROWS)
+    assert store.price_scale == 100
+    assert _plain(store) == _plain(load_prices(path))
+    assert store[1][1]['B'].buy_orders == {10.3: 7}
+
+
+def test_whole_prices_stay_unscaled(tmp_path):
+    path, store = _store(tmp_path, [row for row in ROWS if ';A;' in row])
+    assert store.price_scale == 1
+    assert _plain(store) == _plain(load_prices(path))
+    assert all(type(price) is int for _, depth in store for price in depth['A'].sell_orders)